@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+build_site Scaling Benchmark
+
+Generates synthetic corpora (see corpus.py) and runs ``build_site.py
+--profile-json`` on each, reporting per-stage timings and peak memory as
+JSON, so build time can be plotted against corpus size and runs compared.
+
+Every size gets three builds, each in a fresh process so peak memory is
+per build: a cold build into an empty output directory, a no-op rebuild
+and a rebuild after editing one post.
+
+Run from the repository root:
+    python benchmarks/bench_build.py --sizes 10,100,1000 --output build.json
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from corpus import generate_corpus
+
+BUILD_SITE = Path(__file__).resolve().parent.parent / "build_site.py"
+RUNS = ("cold", "noop", "edit")
+
+
+def run_build(site_dir, jobs):
+    """Build the site in ``site_dir`` in a new process and return its profile."""
+    report_path = site_dir / "profile.json"
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, str(BUILD_SITE), "--jobs", str(jobs), "--profile-json", str(report_path)],
+        cwd=site_dir,
+        stdout=subprocess.DEVNULL,
+        check=True,
+    )
+    elapsed = time.perf_counter() - started
+    report = json.loads(report_path.read_text(encoding="utf-8"))
+    report["process_s"] = round(elapsed, 4)
+    return report
+
+
+def bench_corpus(size, args):
+    results = []
+    with tempfile.TemporaryDirectory(prefix="blog-build-bench-") as tmp:
+        site_dir = Path(tmp)
+        content_dir = site_dir / "content"
+        slugs = generate_corpus(
+            content_dir,
+            size,
+            sections=args.sections,
+            paragraphs=args.paragraphs,
+            iframe_density=args.iframe_density,
+            heavy_every=args.heavy_every,
+            seed=args.seed,
+        )
+        corpus_bytes = sum(path.stat().st_size for path in content_dir.glob("*.md"))
+        for run in RUNS:
+            if run == "edit":
+                edited = content_dir / f"{slugs[len(slugs) // 2]}.md"
+                with open(edited, "a", encoding="utf-8") as f:
+                    f.write("\nOne more sentence for the benchmark.\n")
+            summary = run_build(site_dir, args.jobs)
+            summary.update(corpus_size=size, corpus_bytes=corpus_bytes, run=run)
+            results.append(summary)
+            print(
+                f"  {size:>6} posts  {run:<5} {summary['total_s']:>9.3f} s"
+                f"  ({summary['written']} written)  peak {summary['peak_rss_mb']} MB",
+                file=sys.stderr,
+            )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark build_site.py against corpus size.")
+    parser.add_argument(
+        "--sizes", default="10,100,1000",
+        type=lambda value: [int(size) for size in value.split(",")],
+        help="comma-separated corpus sizes",
+    )
+    parser.add_argument("--sections", type=int, default=4, help="sections per post")
+    parser.add_argument("--paragraphs", type=int, default=3, help="paragraphs per section")
+    parser.add_argument(
+        "--iframe-density", type=float, default=0.0,
+        help="probability that a section embeds a chart iframe",
+    )
+    parser.add_argument(
+        "--heavy-every", type=int, default=10,
+        help="make every Nth post iframe-heavy like the migrant-labor article (0 disables)",
+    )
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="build_site.py --jobs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        results.extend(bench_corpus(size, args))
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "jobs": args.jobs,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Page Shell Micro-benchmark
+
+Compares rendering a page by rebuilding the shell on every call (what
+generate_html_page() used to do) against joining the precompiled
+PAGE_SHELLS byte segments, for both blog_server.py and build_site.py.
+
+Run from the repository root:
+    python benchmarks/bench_page_shell.py
+"""
+
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import blog_server  # noqa: E402
+import build_site  # noqa: E402
+
+TITLE = "Interest Rate Impact on Markets"
+BODY = "<main><div class=\"container\"><p>Lorem ipsum dolor sit amet.</p></div></main>" * 40
+ITERATIONS = 20000
+
+
+def render_uncompiled(module, title, body, page_type):
+    """Rebuild the shell per call, as before precompilation."""
+    head, header, footer = module.compile_page_shell(page_type)
+    body = module.minify_html(body).encode("utf-8")
+    return b"".join((head, title.encode("utf-8"), header, body, footer))
+
+
+def render_precompiled(module, title, body, page_type):
+    return module.generate_html_page(title, body, page_type)
+
+
+def peak_allocation(func, *args):
+    """Return the peak bytes allocated while rendering one page."""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak - baseline
+
+
+def bench(module):
+    print(f"{module.__name__}:")
+    for label, func in (("uncompiled", render_uncompiled), ("precompiled", render_precompiled)):
+        args = (module, TITLE, BODY, "article")
+        seconds = timeit.timeit(lambda: func(*args), number=ITERATIONS)
+        print(
+            f"  {label:<12} {seconds / ITERATIONS * 1e6:8.2f} us/render"
+            f"  {peak_allocation(func, *args) / 1024:8.1f} KiB peak"
+        )
+
+
+if __name__ == "__main__":
+    for module in (blog_server, build_site):
+        bench(module)
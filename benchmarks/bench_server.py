@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+blog_server Load and Latency Benchmark
+
+Generates synthetic corpora (see corpus.py), drives the blog_server ASGI app
+in-process with httpx and reports requests/sec and p50/p95/p99 latency for
+``/``, ``/article/{slug}``, ``/search`` and ``/health`` as JSON, so runs can be compared.
+
+Each corpus starts cold: the shared SQLite render cache is disabled and
+every in-memory cache is replaced. ``startup_s`` is the time to load the
+corpus; processing the charts in static/, which does not depend on the
+corpus, is reported separately as ``charts_s``.
+
+Run from the repository root:
+    python benchmarks/bench_server.py --sizes 10,1000,10000 --output bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# Never read or write the render cache shared with real server runs
+os.environ["BLOG_RENDER_CACHE"] = ""
+
+import blog_server  # noqa: E402
+from corpus import generate_corpus  # noqa: E402
+
+ENDPOINTS = ("/", "/article/{slug}", "/search?q=labor+market", "/health")
+
+
+def reset_server(content_dir):
+    """Point blog_server at a new content directory with empty caches."""
+    blog_server.CONTENT_DIR = content_dir
+    blog_server.post_cache = blog_server.PostCache(content_dir)
+    blog_server.post_bodies = blog_server.PostBodyCache()
+    sections = blog_server.section_renderer
+    blog_server.section_renderer = blog_server.SectionRenderer(
+        postprocess=sections.postprocess,
+        max_entries=sections.max_entries,
+        on_lookup=sections.on_lookup,
+        timed=sections.timed,
+    )
+    blog_server.page_cache = blog_server.PageCache()
+    blog_server.search_index = blog_server.SearchIndex(blog_server.load_post_source)
+    blog_server.post_cache.add_listener(blog_server.page_cache.discard)
+    blog_server.post_cache.add_listener(blog_server.update_search_index)
+
+
+@contextmanager
+def timing_chart_loading():
+    """Yield a list that collects the seconds blog_server spends processing charts."""
+    load_chart_assets = blog_server.load_chart_assets
+    timings = []
+
+    def load():
+        started = time.perf_counter()
+        load_chart_assets()
+        timings.append(time.perf_counter() - started)
+
+    blog_server.load_chart_assets = load
+    try:
+        yield timings
+    finally:
+        blog_server.load_chart_assets = load_chart_assets
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    position = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[position]
+
+
+async def drive(client, paths, concurrency):
+    """Issue the requests with ``concurrency`` workers and summarise latencies."""
+    queue = list(reversed(paths))
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while queue:
+            path = queue.pop()
+            started = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(paths),
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "rps": round(len(paths) / elapsed, 1) if elapsed else None,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+async def bench_corpus(size, args):
+    results = []
+    with tempfile.TemporaryDirectory(prefix="blog-bench-") as tmp:
+        content_dir = Path(tmp)
+        slugs = generate_corpus(
+            content_dir, size, heavy_every=args.heavy_every, seed=args.seed
+        )
+        reset_server(content_dir)
+        rng = random.Random(args.seed)
+
+        with timing_chart_loading() as chart_timings:
+            started = time.perf_counter()
+            async with blog_server.lifespan(blog_server.app):
+                charts = sum(chart_timings)
+                startup = time.perf_counter() - started - charts
+                transport = httpx.ASGITransport(app=blog_server.app)
+                async with httpx.AsyncClient(
+                    transport=transport,
+                    base_url="http://bench",
+                    headers={"Accept-Encoding": "br, gzip"},
+                ) as client:
+                    for endpoint in ENDPOINTS:
+                        paths = [
+                            endpoint.format(slug=rng.choice(slugs)) for _ in range(args.requests)
+                        ]
+                        summary = await drive(client, paths, args.concurrency)
+                        summary.update(
+                            corpus_size=size,
+                            endpoint=endpoint,
+                            concurrency=args.concurrency,
+                            startup_s=round(startup, 3),
+                            charts_s=round(charts, 3),
+                        )
+                        results.append(summary)
+                        print(
+                            f"  {size:>6} posts  {endpoint:<16} {summary['rps']:>9} req/s"
+                            f"  p50 {summary['p50_ms']:>8} ms  p95 {summary['p95_ms']:>8} ms"
+                            f"  p99 {summary['p99_ms']:>8} ms",
+                            file=sys.stderr,
+                        )
+    return results
+
+
+async def run(args):
+    results = []
+    for size in args.sizes:
+        results.extend(await bench_corpus(size, args))
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "requests_per_endpoint": args.requests,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark blog_server in-process.")
+    parser.add_argument(
+        "--sizes", default="10,1000,10000",
+        type=lambda value: [int(size) for size in value.split(",")],
+        help="comma-separated corpus sizes",
+    )
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--heavy-every", type=int, default=10,
+        help="make every Nth post iframe-heavy like the migrant-labor article (0 disables)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Synthetic Corpus Generator
+
+Writes N Markdown posts in the blog's content format for benchmarks. Posts
+are deterministic for a given seed. Every ``heavy_every``-th post is shaped
+like the migrant-labor article: many sections, long paragraphs and a chart
+iframe in each section.
+
+Usage:
+    python benchmarks/corpus.py OUTPUT_DIR --posts 1000 [--iframe-density 0.2]
+"""
+
+import argparse
+import random
+from datetime import date, timedelta
+from pathlib import Path
+
+WORDS = (
+    "market inflation yield bond equity growth labor wage rate policy fiscal "
+    "monetary capital sector output demand supply credit spread index volatility "
+    "dividend portfolio migration employment productivity census revenue tax"
+).split()
+
+IFRAME_TEMPLATE = """
+<div style="width: 100%; max-width: 800px; margin: auto;">
+<iframe src="_static/chart_{n}.html" title="Chart {n}" style="width: 100%; height: 430px; border: none;">
+Your browser does not support iframes.
+</iframe>
+</div>
+"""
+
+
+def sentence(rng, words=14):
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text.capitalize() + "."
+
+
+def generate_post(number, rng, sections=4, paragraphs=3, iframe_density=0.0):
+    """Return the Markdown source of one synthetic post."""
+    published = date(2015, 1, 1) + timedelta(days=number % 3650)
+    lines = [
+        f"# Synthetic Post {number}: {sentence(rng, 5)[:-1]}",
+        f"date: {published.isoformat()}",
+        f"author: Author {number % 17}",
+        "",
+        sentence(rng, 30),
+        "",
+    ]
+    for section in range(sections):
+        lines.append(f"## Section {section + 1}: {sentence(rng, 4)[:-1]}")
+        lines.append("")
+        for _ in range(paragraphs):
+            lines.append(" ".join(sentence(rng) for _ in range(rng.randint(3, 7))))
+            lines.append("")
+        if section % 2 == 1:
+            lines.extend(f"- {sentence(rng, 8)}" for _ in range(4))
+            lines.append("")
+        if rng.random() < iframe_density:
+            lines.append(IFRAME_TEMPLATE.format(n=f"{number}_{section}"))
+    return "\n".join(lines)
+
+
+def generate_corpus(
+    directory,
+    count,
+    sections=4,
+    paragraphs=3,
+    iframe_density=0.0,
+    heavy_every=0,
+    seed=0,
+):
+    """
+    Write ``count`` posts into ``directory`` and return their slugs.
+
+    Every ``heavy_every``-th post (0 disables) is iframe-heavy: 20 sections
+    of 4 paragraphs, each with a chart iframe.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    slugs = []
+    for number in range(count):
+        heavy = heavy_every and number % heavy_every == 0
+        source = generate_post(
+            number,
+            rng,
+            sections=20 if heavy else sections,
+            paragraphs=4 if heavy else paragraphs,
+            iframe_density=1.0 if heavy else iframe_density,
+        )
+        slug = f"synthetic-post-{number:06d}"
+        (directory / f"{slug}.md").write_text(source, encoding="utf-8")
+        slugs.append(slug)
+    return slugs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic blog corpus.")
+    parser.add_argument("output", type=Path, help="directory to write posts into")
+    parser.add_argument("--posts", type=int, default=1000)
+    parser.add_argument("--sections", type=int, default=4, help="sections per post")
+    parser.add_argument("--paragraphs", type=int, default=3, help="paragraphs per section")
+    parser.add_argument(
+        "--iframe-density", type=float, default=0.0,
+        help="probability that a section embeds a chart iframe",
+    )
+    parser.add_argument(
+        "--heavy-every", type=int, default=0,
+        help="make every Nth post iframe-heavy like the migrant-labor article",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    slugs = generate_corpus(
+        args.output,
+        args.posts,
+        sections=args.sections,
+        paragraphs=args.paragraphs,
+        iframe_density=args.iframe_density,
+        heavy_every=args.heavy_every,
+        seed=args.seed,
+    )
+    print(f"Wrote {len(slugs)} posts to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Finance Blog Asset Helpers
+
+Shared asset processing for the dynamic server (blog_server.py) and the
+static site generator (build_site.py): minification, precompression and
+content-hash fingerprinting of generated and static assets.
+"""
+
+import gzip
+import hashlib
+import os
+import re
+import threading
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+
+FINGERPRINT_LENGTH = 10
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+_CSS_SPACE_RE = re.compile(r"\s+")
+_CSS_PUNCT_RE = re.compile(r"\s*([{};,>])\s*")
+_CSS_COLON_RE = re.compile(r":\s+")
+_HTML_VERBATIM_RE = re.compile(
+    r"(<(pre|textarea|script|style)\b.*?</\2\s*>)", re.I | re.S
+)
+_HTML_SPACE = " \t\r\f\v"
+
+# Content-Encoding tokens in order of preference
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def fingerprint(data, length=FINGERPRINT_LENGTH):
+    """Return a short, stable content hash for bytes."""
+    return hashlib.sha256(data).hexdigest()[:length]
+
+
+def hashed_name(name, digest):
+    """Insert a content hash before a file name's extension (theme.css -> theme.<hash>.css)."""
+    stem, dot, suffix = name.rpartition(".")
+    if not dot:
+        return f"{name}.{digest}"
+    return f"{stem}.{digest}.{suffix}"
+
+
+def minify_css(css):
+    """Strip comments and redundant whitespace from generated CSS."""
+    css = _CSS_COMMENT_RE.sub("", css)
+    css = _CSS_SPACE_RE.sub(" ", css)
+    css = _CSS_PUNCT_RE.sub(r"\1", css)
+    css = _CSS_COLON_RE.sub(":", css)
+    return css.replace(";}", "}").strip()
+
+
+def minify_html(html):
+    """
+    Collapse indentation and blank lines in generated HTML.
+
+    Any whitespace run containing a newline becomes a single newline, which
+    renders identically; <pre>, <textarea>, <script> and <style> blocks are
+    left untouched. Leading and trailing whitespace is kept so that page
+    fragments can be minified separately and joined.
+    """
+    parts = _HTML_VERBATIM_RE.split(html)
+    out = []
+    # split() yields text, verbatim block, tag name, text, ...
+    for i in range(0, len(parts), 3):
+        out.append(_collapse_newline_runs(parts[i]))
+        if i + 1 < len(parts):
+            out.append(parts[i + 1])
+    return "".join(out)
+
+
+def _collapse_newline_runs(text):
+    lines = text.split("\n")
+    if len(lines) == 1:
+        return text
+    middle = (line.strip(_HTML_SPACE) for line in lines[1:-1])
+    return "\n".join(
+        [lines[0].rstrip(_HTML_SPACE), *filter(None, middle), lines[-1].lstrip(_HTML_SPACE)]
+    )
+
+
+def compress_variants(data, brotli_quality=11):
+    """Return {encoding: compressed bytes} for every supported encoding."""
+    variants = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(data, quality=brotli_quality)
+    return variants
+
+
+def choose_encoding(accept_encoding, available):
+    """
+    Pick the preferred Content-Encoding from an Accept-Encoding header.
+
+    Returns None when the identity representation should be sent.
+    """
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for item in accept_encoding.split(","):
+        token, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token.strip().lower()] = quality
+
+    for encoding in ENCODINGS:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if encoding in available and quality > 0:
+            return encoding
+    return None
+
+
+def file_fingerprint(path, length=FINGERPRINT_LENGTH):
+    """Return the content hash of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:length]
+
+
+class AssetManifest:
+    """
+    Content-hash manifest for the files under a static directory.
+
+    Maps each file's relative path (``charts/gdp.html``) to a fingerprinted
+    name (``charts/gdp.<hash>.html``) and back, and rewrites references to
+    ``url_prefix + path`` in HTML to the fingerprinted URLs. Hashes are
+    cached by (mtime, size) so a rescan only re-reads changed files.
+    """
+
+    def __init__(self, root, url_prefix="/static/"):
+        self.root = Path(root)
+        self.url_prefix = url_prefix
+        self._hashed = {}
+        self._originals = {}
+        self._stamps = {}
+        self._lock = threading.Lock()
+        self._reference_re = re.compile(
+            r"(?<=[\"'(;=])" + re.escape(url_prefix) + r"([^\"'()\s?#&<>]+)"
+        )
+
+    def __len__(self):
+        return len(self._hashed)
+
+    def __iter__(self):
+        return iter(list(self._hashed))
+
+    def scan(self):
+        """(Re)fingerprint every file under the root directory."""
+        with self._lock:
+            hashed = {}
+            stamps = {}
+            if self.root.is_dir():
+                for dirpath, _, filenames in os.walk(self.root):
+                    for filename in filenames:
+                        path = Path(dirpath, filename)
+                        rel = path.relative_to(self.root).as_posix()
+                        stat = path.stat()
+                        stamp = (stat.st_mtime_ns, stat.st_size)
+                        previous = self._stamps.get(rel)
+                        if previous is not None and previous[0] == stamp:
+                            digest = previous[1]
+                        else:
+                            digest = file_fingerprint(path)
+                        stamps[rel] = (stamp, digest)
+                        head, _, name = rel.rpartition("/")
+                        hashed[rel] = (head + "/" if head else "") + hashed_name(name, digest)
+            self._stamps = stamps
+            self._hashed = hashed
+            self._originals = {value: key for key, value in hashed.items()}
+        return self
+
+    def register(self, rel, data):
+        """
+        Fingerprint a file by the bytes actually served for it.
+
+        For files that are rewritten before serving (charts); a later
+        ``scan()`` keeps the registered hash while the file is unchanged.
+        """
+        digest = fingerprint(data)
+        with self._lock:
+            entry = self._stamps.get(rel)
+            if entry is None:
+                return None
+            self._stamps[rel] = (entry[0], digest)
+            self._originals.pop(self._hashed[rel], None)
+            head, _, name = rel.rpartition("/")
+            hashed = self._hashed[rel] = (head + "/" if head else "") + hashed_name(name, digest)
+            self._originals[hashed] = rel
+        return hashed
+
+    def digest(self, rel):
+        """Return the content hash of a file, or None."""
+        entry = self._stamps.get(rel)
+        return entry[1] if entry is not None else None
+
+    def hashed_path(self, rel):
+        """Return the fingerprinted relative path for a file, or None."""
+        return self._hashed.get(rel)
+
+    def resolve(self, hashed_rel):
+        """Return the original relative path for a fingerprinted one, or None."""
+        return self._originals.get(hashed_rel)
+
+    def url(self, rel):
+        """Return the fingerprinted URL for a file (the plain URL if unknown)."""
+        return self.url_prefix + self._hashed.get(rel, rel)
+
+    def rewrite(self, html):
+        """Rewrite references to known static files to their fingerprinted URLs."""
+        return self._reference_re.sub(lambda match: self.url(match.group(1)), html)
@@ -0,0 +1,143 @@
+"""
+Finance Blog Render Cache
+
+A persistent cache of rendered post bodies in a local SQLite database,
+keyed by the hash of the post's source and the renderer version. Several
+server processes (e.g. uvicorn workers) can share one database file: a
+post rendered by any of them is served by the others without converting
+the Markdown again.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for another process's write lock before giving up
+BUSY_TIMEOUT = 5.0
+# Switching a new database to WAL takes an exclusive lock that the busy
+# timeout does not wait for; processes opening it together retry this often
+WAL_ATTEMPTS = 10
+# Oldest entries are pruned once the cache holds more than max_entries;
+# the check runs every PRUNE_INTERVAL writes
+PRUNE_INTERVAL = 256
+
+
+class RenderCache:
+    """
+    SQLite-backed (content, toc) store shared by all processes on a host.
+
+    build_site.py and blog_server.py also keep converted Markdown sections
+    here, as (html, TOC tokens as JSON) under ``section-<hash>`` digests.
+
+    Keys combine a source content hash with the renderer version, so a new
+    renderer never reads bodies rendered by an old one. Database errors are
+    logged and treated as misses: the cache only ever saves work. If the
+    database cannot be opened at all, the cache is disabled for good rather
+    than reopened on every call.
+    """
+
+    def __init__(self, path, renderer_version, max_entries=100_000):
+        self.path = Path(path)
+        self.renderer_version = renderer_version
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        self._failed = False
+        self.disabled = False
+
+    def open(self):
+        """Create the database now, e.g. before starting worker processes that share it."""
+        try:
+            self._connection()
+        except (sqlite3.Error, OSError):
+            self._error("open")
+        return self
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        # A connection must not be used across fork() (build_site.py workers)
+        if connection is None or self._local.pid != os.getpid():
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+                self._set_up(connection)
+            except (sqlite3.Error, OSError):
+                # Opening fails the same way every time: stop trying
+                self.disabled = True
+                raise
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _set_up(self, connection):
+        try:
+            connection.execute(f"PRAGMA busy_timeout={int(BUSY_TIMEOUT * 1000)}")
+            for attempt in range(1, WAL_ATTEMPTS + 1):
+                try:
+                    connection.execute("PRAGMA journal_mode=WAL")
+                    break
+                except sqlite3.OperationalError:
+                    if attempt == WAL_ATTEMPTS:
+                        raise
+                    time.sleep(0.01 * attempt)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS renders ("
+                "key TEXT PRIMARY KEY, content TEXT NOT NULL, toc TEXT NOT NULL)"
+            )
+        except sqlite3.Error:
+            connection.close()
+            raise
+
+    def _key(self, digest):
+        return f"{self.renderer_version}:{digest}"
+
+    def _error(self, action):
+        # Log the first failure only; a broken cache must not flood the log
+        if not self._failed:
+            self._failed = True
+            logger.exception("Render cache %s failed (%s); continuing without it", action, self.path)
+
+    def get(self, digest):
+        """Return the cached (content, toc) for a source digest, or None."""
+        if self.disabled:
+            return None
+        try:
+            row = self._connection().execute(
+                "SELECT content, toc FROM renders WHERE key = ?", (self._key(digest),)
+            ).fetchone()
+        except (sqlite3.Error, OSError):
+            self._error("read")
+            return None
+        return tuple(row) if row is not None else None
+
+    def put(self, digest, body):
+        """Store the (content, toc) rendered from a source digest."""
+        if self.disabled:
+            return
+        content, toc = body
+        try:
+            connection = self._connection()
+            connection.execute(
+                "INSERT OR REPLACE INTO renders (key, content, toc) VALUES (?, ?, ?)",
+                (self._key(digest), content, toc),
+            )
+            self._writes += 1
+            if self._writes % PRUNE_INTERVAL == 0:
+                self.prune()
+        except (sqlite3.Error, OSError):
+            self._error("write")
+
+    def prune(self):
+        """Drop the oldest entries beyond ``max_entries``."""
+        # INSERT OR REPLACE assigns a new rowid, so rowids order entries by last write
+        self._connection().execute(
+            "DELETE FROM renders WHERE rowid <= (SELECT MAX(rowid) FROM renders) - ?",
+            (self.max_entries,),
+        )
@@ -0,0 +1,274 @@
+"""
+Finance Blog Chart Assets
+
+Processing of the Plotly chart files in static/ for both the static site
+generator (build_site.py) and the dynamic server (blog_server.py). Most
+charts were exported with plotly.js inlined, so each file carries its own
+3.6 MB copy of the library. The copy is moved to one shared script with a
+fingerprinted name, so a browser downloads and caches it once, and each
+chart keeps only its figure and a <script src> pointing at the shared file.
+
+The figure data itself is then compacted: floats can be rounded to a
+number of significant digits and numeric arrays are stored as base64
+typed arrays wherever that is shorter than their JSON.
+"""
+
+import base64
+import json
+import math
+import re
+import struct
+from pathlib import Path
+
+from blog_assets import fingerprint, hashed_name
+
+
+# The <script> element of an inlined plotly.js bundle starts with its banner
+PLOTLY_BUNDLE_RE = re.compile(rb"<script\b[^>]*>\s*/\*\*\s*\* plotly\.js v([\w.+-]+)")
+SCRIPT_END = b"</script>"
+# Version of plotly.js a chart loads, from its <script src> or inlined banner
+PLOTLY_VERSION_RE = re.compile(r"plotly(?:\.js v|-)(\d+)\.(\d+)\.(\d+)")
+# Start of the arguments of Plotly.newPlot("<div id>", [traces], {layout}, ...)
+NEW_PLOT_RE = re.compile(r"Plotly\.newPlot\(\s*(?=\")")
+ARGUMENT_SEPARATOR_RE = re.compile(r"\s*,\s*")
+# plotly.js decodes {"dtype", "bdata"} typed arrays since 2.28
+TYPED_ARRAYS_SINCE = (2, 28)
+# Trace attributes holding numeric data arrays, as paths into the trace. Other
+# arrays (table cells, domains, colour scales) are left untouched.
+DATA_ARRAY_PATHS = frozenset(
+    [
+        (key,)
+        for key in (
+            "x", "y", "z", "r", "theta", "a", "b", "c", "values", "lat", "lon",
+            "open", "high", "low", "close", "base", "width", "offset", "customdata",
+        )
+    ]
+    + [("marker", key) for key in ("color", "size", "opacity")]
+    + [("marker", "line", key) for key in ("color", "width")]
+    + [(error, key) for error in ("error_x", "error_y") for key in ("array", "arrayminus")]
+)
+# Typed array dtypes for integers, smallest first: (dtype, struct code, min, max)
+INTEGER_DTYPES = (
+    ("i1", "b", -(1 << 7), (1 << 7) - 1),
+    ("u1", "B", 0, (1 << 8) - 1),
+    ("i2", "h", -(1 << 15), (1 << 15) - 1),
+    ("u2", "H", 0, (1 << 16) - 1),
+    ("i4", "i", -(1 << 31), (1 << 31) - 1),
+    ("u4", "I", 0, (1 << 32) - 1),
+)
+
+
+def split_plotly(data):
+    """
+    Split chart HTML around an inlined plotly.js bundle.
+
+    Returns (head, library, tail, version), where head and tail exclude
+    the <script> element, or None if the file does not inline plotly.js.
+    """
+    match = PLOTLY_BUNDLE_RE.search(data)
+    if match is None:
+        return None
+    start = data.index(b">", match.start()) + 1
+    end = data.find(SCRIPT_END, start)
+    if end < 0:
+        return None
+    return data[:match.start()], data[start:end], data[end + len(SCRIPT_END):], match.group(1).decode()
+
+
+class PlotlyExtractor:
+    """
+    Replaces inlined plotly.js bundles with references to shared scripts.
+
+    ``scripts`` maps each shared script's name (``plotly-<version>.min.<hash>.js``)
+    to its bytes; charts with the same library share one script.
+    """
+
+    def __init__(self):
+        self.scripts = {}
+
+    def process(self, data, depth=0):
+        """
+        Return (chart bytes, script name) for chart HTML.
+
+        The script is referenced relative to the chart, which sits ``depth``
+        directories below the shared script. Files without an inlined
+        bundle are returned unchanged with a script name of None.
+        """
+        parts = split_plotly(data)
+        if parts is None:
+            return data, None
+        head, library, tail, version = parts
+        name = hashed_name(f"plotly-{version}.min.js", fingerprint(library))
+        self.scripts.setdefault(name, library)
+        tag = f'<script charset="utf-8" src="{"../" * depth}{name}"></script>'
+        return head + tag.encode("utf-8") + tail, name
+
+
+class ChartAssets:
+    """
+    The chart files under a static directory with plotly.js extracted and
+    their figures compacted (see compact_chart()).
+
+    ``scan()`` processes every HTML file below ``root``; ``files`` then
+    maps the relative path of each file that changed to its rewritten
+    bytes, ``sizes`` maps it to its (original, compacted) size in bytes
+    and ``scripts`` maps the shared scripts' names (at the top of ``root``)
+    to their bytes. Other files are left to be served as is.
+    """
+
+    def __init__(self, root, precision=None, binary=True):
+        self.root = Path(root)
+        self.precision = precision
+        self.binary = binary
+        self.files = {}
+        self.sizes = {}
+        self.scripts = {}
+
+    def __len__(self):
+        return len(self.files)
+
+    def scan(self):
+        """(Re)process every chart under the root directory."""
+        extractor = PlotlyExtractor()
+        files = {}
+        sizes = {}
+        if self.root.is_dir():
+            for path in sorted(self.root.rglob("*.html")):
+                rel = path.relative_to(self.root).as_posix()
+                original = path.read_bytes()
+                data, _ = extractor.process(original, rel.count("/"))
+                data = compact_chart(data, self.precision, self.binary)
+                if data != original:
+                    files[rel] = data
+                    sizes[rel] = (len(original), len(data))
+        self.files = files
+        self.sizes = sizes
+        self.scripts = extractor.scripts
+        return self
+
+
+def plotly_version(html):
+    """Return the (major, minor, patch) plotly.js version a chart loads, or None."""
+    match = PLOTLY_VERSION_RE.search(html)
+    return tuple(int(part) for part in match.groups()) if match else None
+
+
+def round_significant(value, precision):
+    """Round a float to ``precision`` significant digits."""
+    if not math.isfinite(value):
+        return value
+    return float(f"{value:.{precision}g}")
+
+
+def typed_array(values):
+    """Return the {"dtype", "bdata"} typed array for a list of numbers, or None."""
+    if None in values:
+        # Gaps have no typed array representation
+        return None
+    if all(type(value) is int for value in values):
+        low, high = min(values), max(values)
+        for dtype, code, minimum, maximum in INTEGER_DTYPES:
+            if minimum <= low and high <= maximum:
+                break
+        else:
+            return None
+    else:
+        dtype, code = "f8", "d"
+    data = struct.pack(f"<{len(values)}{code}", *values)
+    return {"dtype": dtype, "bdata": base64.b64encode(data).decode("ascii")}
+
+
+def compact_array(values, precision=None, binary=True):
+    """Return a numeric array rounded and, where shorter, as a typed array."""
+    if precision is not None:
+        values = [
+            round_significant(value, precision) if type(value) is float else value
+            for value in values
+        ]
+    if binary:
+        encoded = typed_array(values)
+        if encoded is not None and len(json.dumps(encoded)) < len(json.dumps(values)):
+            return encoded
+    return values
+
+
+def _is_numeric_array(value):
+    # Numbers, possibly with gaps (null)
+    return (
+        type(value) is list
+        and any(type(item) in (int, float) for item in value)
+        and all(item is None or type(item) in (int, float) for item in value)
+    )
+
+
+def compact_trace(trace, precision=None, binary=True, path=()):
+    """Compact the numeric data arrays of a trace (a dict) in place."""
+    for key, value in trace.items():
+        key_path = path + (key,)
+        if type(value) is dict:
+            compact_trace(value, precision, binary, key_path)
+        elif key_path in DATA_ARRAY_PATHS and _is_numeric_array(value):
+            trace[key] = compact_array(value, precision, binary)
+
+
+def dump_figure_json(value):
+    """Serialise figure data compactly, safe to embed in a <script> element."""
+    text = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    return (
+        text.replace("</", "<\\/")
+        .replace("<!--", "\\u003c!--")
+        .replace("\u2028", "\\u2028")
+        .replace("\u2029", "\\u2029")
+    )
+
+
+def compact_chart(data, precision=None, binary=True):
+    """
+    Return chart HTML (bytes) with the traces of its figures compacted.
+
+    ``precision`` rounds floats to that many significant digits (None keeps
+    them exact). With ``binary``, numeric arrays become base64 typed arrays
+    when that is shorter and the chart loads a plotly.js that supports them.
+    Traces and layout are re-serialised without the exporter's whitespace
+    and ``\\u`` escapes. The result is deterministic and compacting it again
+    changes nothing.
+    """
+    html = data.decode("utf-8")
+    version = plotly_version(html)
+    binary = binary and version is not None and version[:2] >= TYPED_ARRAYS_SINCE
+    decoder = json.JSONDecoder()
+    parts = []
+    position = 0
+    for match in NEW_PLOT_RE.finditer(html):
+        if match.start() < position:
+            continue
+        try:
+            _, end = decoder.raw_decode(html, match.end())
+            start = ARGUMENT_SEPARATOR_RE.match(html, end).end()
+            traces, end = decoder.raw_decode(html, start)
+        except (ValueError, AttributeError):
+            continue
+        if type(traces) is not list:
+            continue
+        for trace in traces:
+            if type(trace) is dict:
+                compact_trace(trace, precision, binary)
+        parts.append(html[position:start])
+        parts.append(dump_figure_json(traces))
+        position = end
+        # The layout, if any, is only re-serialised
+        separator = ARGUMENT_SEPARATOR_RE.match(html, end)
+        if separator is None:
+            # Plotly.newPlot("id", [traces]) without a layout
+            continue
+        try:
+            layout, end = decoder.raw_decode(html, separator.end())
+        except ValueError:
+            continue
+        parts.append(html[position:separator.end()])
+        parts.append(dump_figure_json(layout))
+        position = end
+    if not parts:
+        return data
+    parts.append(html[position:])
+    return "".join(parts).encode("utf-8")
@@ -0,0 +1,173 @@
+"""
+Finance Blog Responsive Images
+
+Resized WebP variants of the raster images in static/ for the static site
+generator (build_site.py) and the dynamic server (blog_server.py). Articles
+reference the variants through ``srcset``/``sizes`` (see responsive_images()
+in blog_markdown.py), so phones do not download full-resolution PNGs.
+
+Encoding needs Pillow, which is optional: without it no variants are made
+and images only get explicit dimensions, read from their headers.
+"""
+
+import os
+import struct
+import threading
+from io import BytesIO
+from pathlib import Path
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+# Variant widths in pixels; each image also gets a variant at its own width
+IMAGE_WIDTHS = (320, 640, 960, 1280)
+WEBP_QUALITY = 80
+# Images that get variants (GIFs may be animated and are left alone)
+RASTER_SUFFIXES = (".png", ".jpg", ".jpeg")
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# JPEG start-of-frame markers carry the dimensions (C4, C8 and CC are not frames)
+_JPEG_FRAME_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def image_size(data):
+    """Return the (width, height) of PNG, GIF or JPEG bytes, or None."""
+    if data.startswith(_PNG_SIGNATURE) and data[12:16] == b"IHDR":
+        return struct.unpack(">II", data[16:24])
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return struct.unpack("<HH", data[6:10])
+    if data.startswith(b"\xff\xd8"):
+        position = 2
+        while position + 9 <= len(data):
+            if data[position] != 0xFF:
+                return None
+            marker = data[position + 1]
+            if marker == 0xFF:
+                position += 1
+                continue
+            if marker in _JPEG_FRAME_MARKERS:
+                height, width = struct.unpack(">HH", data[position + 5:position + 9])
+                return width, height
+            (length,) = struct.unpack(">H", data[position + 2:position + 4])
+            position += 2 + length
+    return None
+
+
+def variant_name(name, digest, width):
+    """Return the file name of a variant (chart.png -> chart-640w.<digest>.webp)."""
+    stem = name.rpartition(".")[0] or name
+    return f"{stem}-{width}w.{digest}.webp"
+
+
+class ImageVariants:
+    """
+    WebP variants of raster images, cached on disk by source content hash.
+
+    ``get()`` encodes a variant the first time it is asked for and stores
+    it in ``cache_dir``; an unchanged image is never encoded again, across
+    builds and server restarts.
+    """
+
+    def __init__(self, cache_dir, widths=IMAGE_WIDTHS, quality=WEBP_QUALITY):
+        self.cache_dir = Path(cache_dir)
+        self.widths = widths
+        self.quality = quality
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        return Image is not None
+
+    def widths_for(self, width):
+        """Return the variant widths for an image ``width`` pixels wide (none without Pillow)."""
+        if Image is None:
+            return []
+        return [variant for variant in self.widths if variant < width] + [width]
+
+    def get(self, path, digest, width):
+        """Return the WebP bytes of an image resized to ``width``."""
+        cached = self.cache_dir / f"{digest}-{width}w-q{self.quality}.webp"
+        try:
+            return cached.read_bytes()
+        except FileNotFoundError:
+            pass
+        data = self.encode(path, width)
+        with self._lock:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            temp = cached.with_name(f"{cached.name}.{os.getpid()}.tmp")
+            temp.write_bytes(data)
+            os.replace(temp, cached)
+        return data
+
+    def encode(self, path, width):
+        """Encode an image as WebP at ``width`` pixels, keeping its aspect ratio."""
+        with Image.open(path) as image:
+            has_alpha = image.mode in ("RGBA", "LA") or "transparency" in image.info
+            image = image.convert("RGBA" if has_alpha else "RGB")
+            if width != image.width:
+                height = max(1, round(image.height * width / image.width))
+                image = image.resize((width, height), Image.LANCZOS)
+            output = BytesIO()
+            image.save(output, "WEBP", quality=self.quality, method=6)
+        return output.getvalue()
+
+
+class ResponsiveImages:
+    """
+    Responsive variants of the raster images listed in an AssetManifest.
+
+    ``scan()`` reads the dimensions of every image; ``lookup(src)`` then
+    gives responsive_images() the dimensions and variant URLs of an image
+    URL (plain or fingerprinted), and ``get(path)`` returns the bytes of a
+    variant path under the manifest's root, or None.
+    """
+
+    def __init__(self, manifest, variants):
+        self.manifest = manifest
+        self.variants = variants
+        self._images = {}
+        self._paths = {}
+
+    def scan(self):
+        """(Re)read the dimensions of the images in the manifest."""
+        images = {}
+        paths = {}
+        for rel in self.manifest:
+            if not rel.lower().endswith(RASTER_SUFFIXES):
+                continue
+            try:
+                size = image_size((self.manifest.root / rel).read_bytes())
+            except OSError:
+                continue
+            if size is None:
+                continue
+            digest = self.manifest.digest(rel)
+            head, _, name = rel.rpartition("/")
+            urls = []
+            for width in self.variants.widths_for(size[0]):
+                path = (head + "/" if head else "") + variant_name(name, digest, width)
+                paths[path] = (rel, digest, width)
+                urls.append((self.manifest.url_prefix + path, width))
+            images[rel] = (size[0], size[1], urls)
+        self._images = images
+        self._paths = paths
+        return self
+
+    def lookup(self, src):
+        """Return (width, height, [(variant URL, width), ...]) for an image URL, or None."""
+        prefix = self.manifest.url_prefix
+        if not src.startswith(prefix):
+            return None
+        path = src[len(prefix):]
+        return self._images.get(self.manifest.resolve(path) or path)
+
+    def get(self, path):
+        """Return the WebP bytes of a variant path, or None if it is not one."""
+        variant = self._paths.get(path)
+        if variant is None:
+            return None
+        rel, digest, width = variant
+        return self.variants.get(self.manifest.root / rel, digest, width)
@@ -0,0 +1,404 @@
+"""
+Finance Blog Markdown Post-processing
+
+HTML post-processing stages applied to converted Markdown by
+parse_markdown_file() in build_site.py and render_post_body() in blog_server.py,
+and the section-by-section renderer both of them convert Markdown with.
+"""
+
+import html
+import json
+import re
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
+
+import markdown
+from markdown.extensions.toc import nest_toc_tokens, unique
+
+from blog_assets import fingerprint
+
+
+# Chart embed modes: "lazy" loads a chart when it scrolls into view,
+# "click" shows a lightweight placeholder and loads the chart on click.
+CHART_EMBED_LAZY = "lazy"
+CHART_EMBED_CLICK = "click"
+DEFAULT_CHART_HEIGHT = 400
+
+_IFRAME_RE = re.compile(r"<iframe\b([^>]*)>(.*?)</iframe\s*>", re.I | re.S)
+_ATTR_RE = re.compile(r'([\w:-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')', re.S)
+_STYLE_HEIGHT_RE = re.compile(r"(?:^|;)\s*height\s*:\s*(\d+)px", re.I)
+_STATIC_PREFIX_RE = re.compile(r"^(?:\.?/)?_?static/")
+_IMG_RE = re.compile(r"<img\b([^>]*?)\s*/?>", re.I)
+
+# Sections start at headings of this level or above (## and setext ---)
+# once the current section has SECTION_MIN_SIZE characters (converting each
+# section has a fixed cost); longer sections are also split between
+# top-level blocks (paragraphs, rules, raw HTML) at SECTION_SIZE characters
+SECTION_HEADING_LEVEL = 2
+SECTION_MIN_SIZE = 1024
+SECTION_SIZE = 4096
+SECTION_CACHE_SIZE = 2048
+_FENCE_RE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+_ATX_HEADING_RE = re.compile(r"^(#{1,6})(?!#)")
+_SETEXT_UNDERLINE_RE = re.compile(r"^[=-]+[ ]*$")
+# Blocks that Markdown merges into the block before them (list items,
+# blockquotes, indented continuations) cannot start a section
+_CONTINUATION_RE = re.compile(r"^(?:[\s>]|[*+-][ \t]|\d+\.[ \t])")
+# Raw HTML elements whose content Markdown passes through, even across blank lines
+_RAW_BLOCK_RE = re.compile(
+    r"<(/?)(address|article|aside|blockquote|center|details|div|dl|fieldset|figure|"
+    r"footer|form|header|iframe|main|nav|noscript|ol|p|pre|script|section|style|"
+    r"table|textarea|ul|video)\b[^>]*?(/?)>|<!--|-->",
+    re.I,
+)
+# Link/footnote definitions, abbreviations, [TOC] markers and explicit ids
+# ({#id}, which heading ids are made unique against) apply to the whole
+# document, and definitions (": ...") reach back to the blocks before them,
+# so documents that use any of them are converted in one piece
+_DOCUMENT_WIDE_RE = re.compile(
+    r"^ {0,3}\[[^\]]+\]:|^\*\[[^\]]+\]:|\[TOC\]|\{:?[^}\n]*#[^}\n]*\}|^ {0,3}:[ \t]",
+    re.M,
+)
+# Paragraph appended to each section, so the whitespace Markdown puts after
+# the section's last block is kept (convert() strips it from the end)
+_SECTION_END = "section-end-5f0c2a"
+_HEADING_ID_RE = re.compile(r'(<h[1-6]\b[^>]*?\bid=")([^"]*)(")')
+
+# Width of the article text column in the theme (.container and .article
+# padding), for the ``sizes`` of responsive images
+ARTICLE_WIDTH = 956
+ARTICLE_GUTTER = 144
+MOBILE_BREAKPOINT = 768
+MOBILE_GUTTER = 96
+
+
+def _parse_attrs(attr_text):
+    return {
+        match.group(1).lower(): match.group(2) if match.group(2) is not None else match.group(3)
+        for match in _ATTR_RE.finditer(attr_text)
+    }
+
+
+def _format_attrs(attrs):
+    # Values are kept as they appeared in the source, entities included
+    return "".join(
+        ' %s="%s"' % (name, value.replace('"', "&quot;")) for name, value in attrs.items()
+    )
+
+
+def _placeholder_doc(src, title, accent, background):
+    """Return a tiny srcdoc page whose only content is a link to the chart."""
+    label = title or "interactive chart"
+    return (
+        "<style>html,body{margin:0;height:100%}"
+        "a{display:flex;align-items:center;justify-content:center;height:100%;"
+        "box-sizing:border-box;border:1px dashed " + accent + ";background:" + background + ";"
+        "color:" + accent + ";font:600 15px 'Segoe UI',sans-serif;text-decoration:none}</style>"
+        f'<a href="{src}">&#9654; Load chart: {label}</a>'
+    )
+
+
+def lazy_chart_embeds(
+    html_content,
+    static_url,
+    mode=CHART_EMBED_CLICK,
+    accent="#f0b90b",
+    background="#0d1d30",
+):
+    """
+    Rewrite chart iframes into lazily loaded embeds.
+
+    Every iframe gets ``loading="lazy"``. Iframes pointing at files under
+    ``static/`` (including the legacy ``_static/`` spelling) are charts:
+    their URLs are rewritten to ``static_url``, they get an explicit height
+    so the page does not shift when they load and, in "click" mode, their
+    content is replaced by a placeholder (``srcdoc``) linking to the chart,
+    so the chart itself is only fetched when the reader clicks it.
+    """
+
+    def rewrite(match):
+        attrs = _parse_attrs(match.group(1))
+        inner = match.group(2)
+        src = attrs.get("src", "")
+
+        attrs["loading"] = "lazy"
+        if _STATIC_PREFIX_RE.match(src):
+            src = _STATIC_PREFIX_RE.sub(static_url, src)
+            attrs["src"] = src
+            if "height" not in attrs:
+                style_height = _STYLE_HEIGHT_RE.search(attrs.get("style", ""))
+                attrs["height"] = (
+                    style_height.group(1) if style_height else str(DEFAULT_CHART_HEIGHT)
+                )
+            if mode == CHART_EMBED_CLICK:
+                attrs["srcdoc"] = html.escape(
+                    _placeholder_doc(src, attrs.get("title"), accent, background), quote=True
+                )
+
+        return f"<iframe{_format_attrs(attrs)}>{inner}</iframe>"
+
+    return _IFRAME_RE.sub(rewrite, html_content)
+
+
+def image_sizes(width):
+    """Return the ``sizes`` attribute for an article image ``width`` pixels wide."""
+    width = min(width, ARTICLE_WIDTH)
+    return (
+        f"(max-width: {MOBILE_BREAKPOINT}px) calc(100vw - {MOBILE_GUTTER}px), "
+        f"(max-width: {width + ARTICLE_GUTTER}px) calc(100vw - {ARTICLE_GUTTER}px), {width}px"
+    )
+
+
+def responsive_images(html_content, lookup):
+    """
+    Give local images explicit dimensions and responsive variants.
+
+    ``lookup(src)`` returns ``(width, height, variants)`` for an image it
+    knows, where variants is a list of ``(url, width)`` pairs, or None. The
+    image gets ``width``/``height`` (so the page does not shift while it
+    loads), ``loading="lazy"`` and, when there are variants, a ``srcset``
+    and ``sizes`` that let the browser pick the smallest sufficient one.
+    The original stays in ``src`` for browsers without srcset support.
+    """
+    if "<img" not in html_content:
+        return html_content
+
+    def rewrite(match):
+        attrs = _parse_attrs(match.group(1))
+        info = lookup(attrs.get("src", ""))
+        if info is None:
+            return match.group(0)
+        width, height, variants = info
+
+        if "width" not in attrs and "height" not in attrs:
+            attrs["width"] = str(width)
+            attrs["height"] = str(height)
+        elif attrs.get("width", "").isdigit() and "height" not in attrs:
+            attrs["height"] = str(round(height * int(attrs["width"]) / width))
+        attrs.setdefault("loading", "lazy")
+        attrs.setdefault("decoding", "async")
+        if variants and "srcset" not in attrs:
+            attrs["srcset"] = ", ".join(f"{url} {variant}w" for url, variant in variants)
+            shown = int(attrs["width"]) if attrs.get("width", "").isdigit() else width
+            attrs["sizes"] = image_sizes(shown)
+
+        return f"<img{_format_attrs(attrs)}>"
+
+    return _IMG_RE.sub(rewrite, html_content)
+
+
+def split_sections(
+    source, level=SECTION_HEADING_LEVEL, min_size=SECTION_MIN_SIZE, size=SECTION_SIZE
+):
+    """
+    Split Markdown into sections that convert the same on their own.
+
+    Once the current section is ``min_size`` characters long, a section
+    starts at an ATX or setext heading of ``level`` or above; once it is
+    ``size`` characters long, at any block that
+    Markdown does not merge into the one before it. Either must follow a
+    blank line outside fenced code, raw HTML blocks and comments; the text
+    before the first heading is a section too. Returns None when the
+    document uses constructs that span sections (see _DOCUMENT_WIDE_RE).
+    """
+    if _DOCUMENT_WIDE_RE.search(source):
+        return None
+    lines = source.split("\n")
+    starts = [0]
+    length = 0
+    fence = None
+    depth = 0
+    comment = False
+    for i, line in enumerate(lines):
+        length += len(line) + 1
+        if fence is not None:
+            if line.strip().startswith(fence):
+                fence = None
+            continue
+        match = _FENCE_RE.match(line)
+        if match:
+            fence = match.group(1)
+            continue
+        if depth == 0 and not comment and i > 0 and line[:1].strip() and not lines[i - 1].strip():
+            heading = _ATX_HEADING_RE.match(line)
+            if heading:
+                heading_level = len(heading.group(1))
+            elif i + 1 < len(lines) and _SETEXT_UNDERLINE_RE.match(lines[i + 1]):
+                heading_level = 1 if lines[i + 1].startswith("=") else 2
+            else:
+                heading_level = None
+            if heading_level is not None and heading_level <= level and length > min_size:
+                starts.append(i)
+                length = len(line) + 1
+            elif length > size and not _CONTINUATION_RE.match(line):
+                starts.append(i)
+                length = len(line) + 1
+        for tag in _RAW_BLOCK_RE.finditer(line):
+            text = tag.group(0)
+            if text == "<!--":
+                comment = True
+            elif text == "-->":
+                comment = False
+            elif not comment and tag.group(1):
+                depth = max(0, depth - 1)
+            elif not comment and not tag.group(3):
+                depth += 1
+    starts.append(len(lines))
+    return ["\n".join(lines[start:end]) for start, end in zip(starts, starts[1:])]
+
+
+def _flatten_toc(tokens):
+    flat = []
+    for token in tokens:
+        flat.append({key: value for key, value in token.items() if key != "children"})
+        flat.extend(_flatten_toc(token["children"]))
+    return flat
+
+
+def _escape_attr(value):
+    return html.escape(value, quote=False).replace('"', "&quot;")
+
+
+def _rename_heading_ids(html_content, renames):
+    # Headings appear in TOC order; raw HTML headings that are not in the
+    # TOC have other ids and are skipped
+    pending = iter(renames)
+    current = next(pending, None)
+
+    def rename(match):
+        nonlocal current
+        if current is None or match.group(2) != _escape_attr(current[0]):
+            return match.group(0)
+        new_id = current[1]
+        current = next(pending, None)
+        return match.group(1) + _escape_attr(new_id) + match.group(3)
+
+    return _HEADING_ID_RE.sub(rename, html_content)
+
+
+class SectionRenderer:
+    """
+    Converts Markdown section by section, reusing unchanged sections.
+
+    Long articles are split at their top-level headings (split_sections());
+    each section's HTML and TOC entries are cached by a hash of its source,
+    so an edit to one section only converts that section again. Sections
+    are stitched back together with heading ids made unique across the
+    whole document and one TOC built from all of them, as converting the
+    document at once would. ``postprocess`` is applied to each section's
+    HTML (it must work on fragments).
+
+    Entries live in a bounded in-memory LRU and, if ``store`` is given (a
+    RenderCache), in that store, which several processes can share.
+    ``on_lookup(hit)`` is called for every section looked up, and
+    ``timed(phase)``, a context manager factory, times the stitched TOC's
+    generation as the "toc" phase (a document converted in one piece
+    builds its TOC during conversion).
+    """
+
+    def __init__(
+        self,
+        extensions=("extra", "toc"),
+        postprocess=None,
+        store=None,
+        max_entries=SECTION_CACHE_SIZE,
+        on_lookup=None,
+        timed=None,
+    ):
+        self.extensions = list(extensions)
+        self.postprocess = postprocess
+        self.store = store
+        self.max_entries = max_entries
+        self.on_lookup = on_lookup
+        self.timed = timed
+        self._sections = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def __len__(self):
+        return len(self._sections)
+
+    def _markdown(self):
+        # Markdown instances are not thread-safe; one per thread, reset per use
+        md = getattr(self._local, "md", None)
+        if md is None:
+            md = self._local.md = markdown.Markdown(extensions=self.extensions)
+        return md.reset()
+
+    def _convert(self, source):
+        md = self._markdown()
+        html_content = md.convert(source)
+        if self.postprocess is not None:
+            html_content = self.postprocess(html_content)
+        return html_content, md
+
+    def _convert_section(self, source):
+        md = self._markdown()
+        html_content, end, _ = md.convert(f"{source}\n\n{_SECTION_END}").rpartition(
+            f"<p>{_SECTION_END}</p>"
+        )
+        if not end:
+            # The section ends inside a block (an unclosed fence or element)
+            # that swallowed the marker; only the last one can
+            html_content = self._markdown().convert(source) + "\n"
+        if self.postprocess is not None:
+            html_content = self.postprocess(html_content)
+        return html_content, _flatten_toc(md.toc_tokens)
+
+    def section(self, source):
+        """
+        Return the (html, flat TOC tokens) of one section, from the cache if possible.
+
+        The HTML ends with the whitespace that separates it from the next section.
+        """
+        digest = fingerprint(source.encode("utf-8"))
+        with self._lock:
+            entry = self._sections.get(digest)
+            if entry is not None:
+                self._sections.move_to_end(digest)
+        if entry is None and self.store:
+            stored = self.store.get(f"section-{digest}")
+            if stored is not None:
+                entry = (stored[0], json.loads(stored[1]))
+        if self.on_lookup is not None:
+            self.on_lookup(entry is not None)
+        if entry is None:
+            entry = self._convert_section(source)
+            if self.store:
+                self.store.put(f"section-{digest}", (entry[0], json.dumps(entry[1])))
+        with self._lock:
+            self._sections[digest] = entry
+            self._sections.move_to_end(digest)
+            while len(self._sections) > self.max_entries:
+                self._sections.popitem(last=False)
+        return entry
+
+    def render(self, source):
+        """Convert a Markdown document and return its (html, toc)."""
+        sections = split_sections(source)
+        if sections is None:
+            html_content, md = self._convert(source)
+            return html_content, getattr(md, "toc", "")
+
+        used_ids = set()
+        parts = []
+        tokens = []
+        for section in sections:
+            html_content, section_tokens = self.section(section)
+            renames = []
+            for token in section_tokens:
+                token_id = unique(token["id"], used_ids)
+                if token_id != token["id"]:
+                    renames.append((token["id"], token_id))
+                tokens.append({**token, "id": token_id})
+            if renames:
+                html_content = _rename_heading_ids(html_content, renames)
+            parts.append(html_content)
+
+        with self.timed("toc") if self.timed is not None else nullcontext():
+            md = self._markdown()
+            toc = md.serializer(md.treeprocessors["toc"].build_toc_div(nest_toc_tokens(tokens)))
+            for postprocessor in md.postprocessors:
+                toc = postprocessor.run(toc)
+        return "".join(parts).strip(), toc
@@ -0,0 +1,185 @@
+"""
+Finance Blog Request Metrics
+
+Per-phase timing of the dynamic server's work (file I/O, Markdown
+conversion, TOC, HTML assembly, compression) and cache hit/miss counts.
+Each request's timings are returned in a ``Server-Timing`` header by
+ServerTimingMiddleware and aggregated into histograms that ``/metrics``
+exposes in the Prometheus text format.
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+class Histogram:
+    """Bucketed counts, sum and count of observed durations."""
+
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+
+class Metrics:
+    """
+    Process-wide registry of duration histograms and cache counters.
+
+    Histograms are keyed by (metric, label), e.g. ("phase", "markdown") or
+    ("request", "article"); counters by (cache, result).
+    """
+
+    def __init__(self):
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, metric, label, seconds):
+        with self._lock:
+            histogram = self._histograms.get((metric, label))
+            if histogram is None:
+                histogram = self._histograms[(metric, label)] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, cache, result):
+        with self._lock:
+            self._counters[(cache, result)] = self._counters.get((cache, result), 0) + 1
+
+    def render(self):
+        """Return the metrics in the Prometheus text exposition format."""
+        with self._lock:
+            histograms = sorted(
+                (key, list(h.counts), h.total, h.count) for key, h in self._histograms.items()
+            )
+            counters = sorted(self._counters.items())
+
+        lines = []
+        for metric, label_name, help_text in (
+            ("phase", "phase", "Time spent in each rendering phase."),
+            ("request", "endpoint", "Time until the response headers were sent, per endpoint."),
+        ):
+            name = f"blog_{metric}_duration_seconds"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (kind, label), counts, total, count in histograms:
+                if kind != metric:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip((*BUCKETS, "+Inf"), counts):
+                    cumulative += bucket_count
+                    lines.append(
+                        f'{name}_bucket{{{label_name}="{label}",le="{bound}"}} {cumulative}'
+                    )
+                lines.append(f'{name}_sum{{{label_name}="{label}"}} {total:.6f}')
+                lines.append(f'{name}_count{{{label_name}="{label}"}} {count}')
+
+        lines.append("# HELP blog_cache_lookups_total Cache lookups by cache and result.")
+        lines.append("# TYPE blog_cache_lookups_total counter")
+        for (cache, result), value in counters:
+            lines.append(f'blog_cache_lookups_total{{cache="{cache}",result="{result}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class RequestTimings:
+    """Phase durations and cache results collected while serving one request."""
+
+    __slots__ = ("phases", "caches")
+
+    def __init__(self):
+        self.phases = {}
+        self.caches = {}
+
+    def header(self, total):
+        """Format the collected timings as a Server-Timing header value."""
+        entries = [f"{phase};dur={seconds * 1000:.2f}" for phase, seconds in self.phases.items()]
+        entries.extend(f'{cache}-cache;desc="{result}"' for cache, result in self.caches.items())
+        entries.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(entries)
+
+
+@contextmanager
+def timed(phase):
+    """Time a block as one rendering phase, for the current request and the histograms."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.observe("phase", phase, elapsed)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.phases[phase] = timings.phases.get(phase, 0.0) + elapsed
+
+
+def record_cache(cache, hit):
+    """Count a cache lookup and note its result on the current request."""
+    result = "hit" if hit else "miss"
+    metrics.count(cache, result)
+    timings = _request_timings.get()
+    # A request that missed a cache at least once reports the miss
+    if timings is not None and timings.caches.get(cache) != "miss":
+        timings.caches[cache] = result
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware that adds a Server-Timing header to every HTTP response.
+
+    The header carries the phases recorded up to the moment the headers are
+    sent; for streamed responses, later phases only reach the histograms.
+    Code run in executors must be given a copy of the request's context
+    (``contextvars.copy_context()``) for its phases to be attributed.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+        headers_sent = None
+
+        async def send_with_timing(message):
+            nonlocal headers_sent
+            if message["type"] == "http.response.start":
+                headers_sent = time.perf_counter() - started
+                value = timings.header(headers_sent).encode("latin-1")
+                headers = [*message.get("headers", ()), (b"server-timing", value)]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            if headers_sent is None:
+                headers_sent = time.perf_counter() - started
+            endpoint = scope.get("endpoint")
+            label = "unmatched"
+            if endpoint is not None:
+                label = getattr(endpoint, "__name__", type(endpoint).__name__)
+            metrics.observe("request", label, headers_sent)
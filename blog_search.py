@@ -0,0 +1,300 @@
+"""
+Finance Blog Full-text Search
+
+A positional inverted index over post titles, authors and body text, kept
+up to date incrementally as posts are parsed, with BM25 ranking, quoted
+phrase queries and highlighted snippets. Post text is not kept in memory:
+the Markdown source is fetched through a loader when a post is indexed or
+shown in results.
+"""
+
+import heapq
+import html
+import itertools
+import math
+import re
+import threading
+from array import array
+
+
+TOKEN_RE = re.compile(r"\w+")
+PHRASE_RE = re.compile(r'"([^"]*)"')
+TAG_RE = re.compile(r"<[^>]+>")
+MARKDOWN_LINK_RE = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+# Markup characters (headings, emphasis, code, quotes, tables, rules) become spaces
+MARKDOWN_MARKUP = str.maketrans("#*`>|~=", "       ")
+
+# Title and author matches weigh more than body matches
+FIELD_BOOSTS = {"title": 3.0, "author": 2.0, "body": 1.0}
+# Position gap between fields so that phrases never span two fields
+FIELD_GAP = 1000
+BM25_K1 = 1.2
+BM25_B = 0.75
+SNIPPET_LENGTH = 240
+# Phrase positions are verified best-first; past this many candidates the
+# total number of matches is extrapolated instead of counted
+PHRASE_CHECKS = 250
+# Past this many matching posts only the best of them for the query's rarest
+# term are scored, so common words cost the same as rare ones
+SCORED_CANDIDATES = 1000
+
+
+def tokenize(text):
+    """Lower-case word tokens of a string."""
+    return TOKEN_RE.findall(text.lower())
+
+
+def markdown_to_text(source):
+    """Approximate the plain text of Markdown source without converting it."""
+    text = MARKDOWN_LINK_RE.sub(r"\1", TAG_RE.sub(" ", source))
+    text = html.unescape(text.translate(MARKDOWN_MARKUP).replace("--", " "))
+    return " ".join(text.split())
+
+
+def parse_query(query):
+    """Split a query into (phrases, terms); phrases are lists of tokens."""
+    phrases = [tokenize(phrase) for phrase in PHRASE_RE.findall(query)]
+    phrases = [phrase for phrase in phrases if phrase]
+    terms = tokenize(PHRASE_RE.sub(" ", query))
+    return phrases, terms
+
+
+class _Document:
+    __slots__ = ("slug", "title", "author", "date", "terms", "length", "author_start", "body_start")
+
+
+class SearchIndex:
+    """
+    Positional inverted index mapping each term to ``{slug: (tf, positions)}``.
+
+    Title, author and body tokens share one position space, separated by
+    ``FIELD_GAP``, so phrase matches stay within a field. ``tf`` is the
+    field-boosted term frequency, computed once when the post is indexed.
+
+    ``load_source(slug)`` returns the Markdown body of a post; it is called
+    when a post is indexed and again for the snippets of each result.
+    """
+
+    def __init__(self, load_source):
+        self._load_source = load_source
+        self._postings = {}
+        self._documents = {}
+        self._total_length = 0
+        self._norms = None
+        self._impacts = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._documents)
+
+    def update(self, post):
+        """Add a post to the index, replacing any previous version of it."""
+        document = _Document()
+        document.slug = post["slug"]
+        document.title = post["title"]
+        document.author = post["author"]
+        document.date = post["date"]
+
+        title_tokens = tokenize(document.title)
+        author_tokens = tokenize(document.author)
+        body_tokens = tokenize(markdown_to_text(self._load_source(document.slug)))
+        document.author_start = len(title_tokens) + FIELD_GAP
+        document.body_start = document.author_start + len(author_tokens) + FIELD_GAP
+        document.length = len(title_tokens) + len(author_tokens) + len(body_tokens)
+
+        frequencies = {}
+        positions = {}
+        for field, start, tokens in (
+            ("title", 0, title_tokens),
+            ("author", document.author_start, author_tokens),
+            ("body", document.body_start, body_tokens),
+        ):
+            boost = FIELD_BOOSTS[field]
+            for offset, term in enumerate(tokens, start):
+                frequencies[term] = frequencies.get(term, 0.0) + boost
+                term_positions = positions.get(term)
+                if term_positions is None:
+                    term_positions = positions[term] = array("I")
+                term_positions.append(offset)
+        document.terms = tuple(positions)
+
+        with self._lock:
+            self._remove(document.slug)
+            self._documents[document.slug] = document
+            self._total_length += document.length
+            self._norms = None
+            self._impacts = {}
+            for term, term_positions in positions.items():
+                self._postings.setdefault(term, {})[document.slug] = (
+                    frequencies[term],
+                    term_positions,
+                )
+
+    def remove(self, slug):
+        """Remove a post from the index."""
+        with self._lock:
+            self._remove(slug)
+
+    def _remove(self, slug):
+        document = self._documents.pop(slug, None)
+        if document is None:
+            return
+        self._total_length -= document.length
+        self._norms = None
+        self._impacts = {}
+        for term in document.terms:
+            postings = self._postings[term]
+            del postings[slug]
+            if not postings:
+                del self._postings[term]
+
+    def _has_phrase(self, slug, phrase):
+        # Start positions of the first term from which every later term follows
+        starts = set(self._postings[phrase[0]][slug][1])
+        last = len(phrase) - 1
+        for offset, term in enumerate(phrase[1:last], 1):
+            starts.intersection_update(map((-offset).__add__, self._postings[term][slug][1]))
+        return not starts.isdisjoint(map((-last).__add__, self._postings[phrase[last]][slug][1]))
+
+    def _length_norms(self):
+        # BM25 length normalisation per post, recomputed after the corpus changes
+        if self._norms is None:
+            average_length = self._total_length / len(self._documents) or 1
+            self._norms = {
+                slug: BM25_K1 * (1 - BM25_B + BM25_B * document.length / average_length)
+                for slug, document in self._documents.items()
+            }
+        return self._norms
+
+    def _impact_order(self, term):
+        # Posts containing a term, by their BM25 score for it alone
+        order = self._impacts.get(term)
+        if order is None:
+            postings = self._postings[term]
+            norms = self._length_norms()
+            order = self._impacts[term] = sorted(
+                postings,
+                key=lambda slug: postings[slug][0] / (postings[slug][0] + norms[slug]),
+                reverse=True,
+            )
+        return order
+
+    def _scores(self, candidates, terms):
+        """Return {slug: BM25 score} for the candidate posts."""
+        count = len(self._documents)
+        norms = self._length_norms()
+        scores = dict.fromkeys(candidates, 0.0)
+        for term in terms:
+            postings = self._postings[term]
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            weight = idf * (BM25_K1 + 1)
+            for slug in candidates:
+                tf = postings[slug][0]
+                scores[slug] += weight * tf / (tf + norms[slug])
+        return scores
+
+    def search(self, query, limit=20):
+        """
+        Return ``(results, total, exact)`` for a query, best matches first.
+
+        Every term and quoted phrase must match. Each result is a dict with
+        slug, title, author, date, score and an HTML snippet in which the
+        query terms are wrapped in ``<mark>``. ``exact`` is False when
+        ``total`` is an estimate (see ``PHRASE_CHECKS``). Past
+        ``SCORED_CANDIDATES`` matches, results are ranked among the posts
+        scoring best for the rarest query term only.
+        """
+        phrases, terms = parse_query(query)
+        required = set(terms)
+        for phrase in phrases:
+            required.update(phrase)
+        if not required:
+            return [], 0, True
+
+        with self._lock:
+            if not all(term in self._postings for term in required):
+                return [], 0, True
+            ordered = sorted(required, key=lambda term: len(self._postings[term]))
+            candidates = set(self._postings[ordered[0]])
+            for term in ordered[1:]:
+                candidates.intersection_update(self._postings[term])
+
+            total = len(candidates)
+            if total > SCORED_CANDIDATES:
+                candidates = list(itertools.islice(
+                    (slug for slug in self._impact_order(ordered[0]) if slug in candidates),
+                    SCORED_CANDIDATES,
+                ))
+            scores = self._scores(candidates, required)
+            exact = True
+            if phrases:
+                best = []
+                checked = 0
+                ranked = sorted(candidates, key=scores.__getitem__, reverse=True)
+                for slug in ranked:
+                    if len(best) >= limit and checked >= PHRASE_CHECKS:
+                        break
+                    checked += 1
+                    if all(self._has_phrase(slug, phrase) for phrase in phrases):
+                        best.append(slug)
+                matched = len(best)
+                del best[limit:]
+                exact = checked == total
+                total = matched if exact else round(matched * total / checked)
+            else:
+                best = heapq.nlargest(limit, scores, key=scores.__getitem__)
+            documents = [(scores[slug], self._documents[slug]) for slug in best]
+
+        highlight = re.compile(
+            r"\b(%s)\b" % "|".join(re.escape(term) for term in sorted(required, key=len, reverse=True)),
+            re.I,
+        )
+        results = [
+            {
+                "slug": document.slug,
+                "title": document.title,
+                "author": document.author,
+                "date": document.date,
+                "score": round(score, 4),
+                "snippet": markdown_snippet(self._load_source(document.slug), highlight),
+            }
+            for score, document in documents
+        ]
+        return results, total, exact
+
+
+def markdown_snippet(source, highlight, length=SNIPPET_LENGTH):
+    """Return make_snippet() for Markdown, converting only the lines around the first match."""
+    match = highlight.search(source)
+    position = match.start() if match else 0
+    start = source.rfind("\n", 0, max(0, position - length)) + 1
+    end = source.find("\n", position + 2 * length)
+    return make_snippet(markdown_to_text(source[start:end if end >= 0 else None]), highlight, length)
+
+
+def make_snippet(text, highlight, length=SNIPPET_LENGTH):
+    """Return an escaped excerpt around the first match with matches in <mark>."""
+    match = highlight.search(text)
+    start = 0
+    if match:
+        start = max(0, match.start() - length // 3)
+        if start:
+            space = text.find(" ", start)
+            start = space + 1 if 0 <= space < match.start() else start
+    end = min(len(text), start + length)
+    if end < len(text):
+        space = text.rfind(" ", start, end)
+        end = space if space > start else end
+    excerpt = text[start:end]
+
+    parts = []
+    last = 0
+    for found in highlight.finditer(excerpt):
+        parts.append(html.escape(excerpt[last:found.start()]))
+        parts.append(f"<mark>{html.escape(found.group())}</mark>")
+        last = found.end()
+    parts.append(html.escape(excerpt[last:]))
+
+    prefix = "&hellip; " if start > 0 else ""
+    suffix = " &hellip;" if end < len(text) else ""
+    return prefix + "".join(parts) + suffix
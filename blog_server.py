@@ -8,19 +8,92 @@ No hand-authored HTML or JavaScript - all output is generated by Python.
 Uses FastAPI to serve pages dynamically and the markdown package for content.
 """
 
+import asyncio
+import contextvars
+import hashlib
+import html
+import json
+import logging
+import math
+import mimetypes
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
 from pathlib import Path
 
 import markdown
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import HTMLResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 
+from blog_assets import (
+    IMMUTABLE_CACHE_CONTROL,
+    AssetManifest,
+    choose_encoding,
+    compress_variants,
+    fingerprint,
+    hashed_name,
+    minify_css,
+    minify_html,
+)
+from blog_cache import RenderCache
+from blog_charts import ChartAssets
+from blog_images import ImageVariants, ResponsiveImages
+from blog_markdown import SectionRenderer, lazy_chart_embeds, responsive_images
+from blog_metrics import ServerTimingMiddleware, metrics, record_cache, timed
+from blog_search import SearchIndex
+import build_site
+
 # Configuration
 CONTENT_DIR = Path("content")
 STATIC_DIR = Path("static")
 SITE_TITLE = "Finance Insights Blog"
 SITE_TAGLINE = "Your trusted source for market analysis and financial news"
+POSTS_PER_PAGE = 10
+# Chart iframes: "click" (placeholder, load on click) or "lazy" (load on scroll)
+CHART_EMBED_MODE = "click"
+# Seconds between background content directory scans
+POST_REFRESH_INTERVAL = 1.0
+# Threads available for file I/O, markdown conversion and page rendering
+RENDER_WORKERS = min(4, os.cpu_count() or 1)
+# Stream uncached article pages, sending the page head before the body is rendered
+STREAM_ARTICLES = True
+# Maximum number of results shown on the search page
+SEARCH_RESULTS = 20
+# Rendered post bodies and pages kept in memory (least recently used are evicted)
+POST_BODY_CACHE_SIZE = 128
+PAGE_CACHE_SIZE = 512
+# Rendered Markdown sections kept in memory, so an edit to a long post only
+# converts the sections that changed (see SectionRenderer)
+SECTION_CACHE_SIZE = 2048
+# SQLite file shared by all worker processes for rendered post bodies and
+# sections ("" disables it)
+RENDER_CACHE_PATH = os.environ.get("BLOG_RENDER_CACHE", ".cache/render-cache.sqlite3")
+# Directory for encoded WebP variants of the images in static/
+IMAGE_CACHE_DIR = os.environ.get("BLOG_IMAGE_CACHE", ".cache/images")
+# Chart figure data: round floats to this many significant digits (None keeps
+# them exact) and store numeric arrays as typed arrays where that is shorter
+CHART_FLOAT_PRECISION = None
+CHART_TYPED_ARRAYS = True
+# Brotli quality for the shared chart scripts compressed at startup; 11 takes
+# about 10 s for plotly.js and saves less than 10% over 9
+CHART_SCRIPT_BROTLI_QUALITY = 9
+# Brotli quality for pages rendered on request: 5 compresses the largest
+# article in about 3 ms, 11 takes over 100 ms for 16% smaller output
+PAGE_BROTLI_QUALITY = 5
+# Bump whenever a change to render_post_body() changes its output
+RENDERER_REVISION = 1
+# "dynamic" renders pages on request, "prebuilt" serves the output of
+# build_site.py from SITE_DIR and "memory" runs build_site.py in memory at
+# startup. Prebuilt pages fall back to dynamic rendering for newer posts.
+SITE_MODE = os.environ.get("BLOG_SITE_MODE", "dynamic")
+SITE_DIR = Path(os.environ.get("BLOG_SITE_DIR", "site"))
 
 # Elegant Finance-themed color palette
 # Colors: Verdant Green, Navy Blue, Gold, Mocha Mousse
@@ -53,13 +126,604 @@ COLORS = {
     "text_primary": "#ffffff",
 }
 
-app = FastAPI(title=SITE_TITLE, description="Dynamic Finance Blog powered by Python")
 
-# Mount static files directory
-if STATIC_DIR.exists():
-    app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
+class PostMeta:
+    """
+    Resident metadata of one post; its rendered body is loaded on demand.
+
+    Only the header fields, the source's location and a hash of its bytes
+    are kept. ``post["title"]``-style access works as for the dicts returned
+    by build_site.parse_markdown_file(); ``post["content"]`` and
+    ``post["toc"]`` come from the bounded ``post_bodies`` cache.
+    """
+
+    __slots__ = (
+        "slug", "title", "date", "author", "published", "path", "body_offset", "digest", "mtime",
+    )
+
+    def __getitem__(self, key):
+        if key == "content":
+            return post_bodies.get(self)[0]
+        if key == "toc":
+            return post_bodies.get(self)[1]
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def read_body(self):
+        """Return the post's Markdown body (the source after the header lines)."""
+        with open(self.path, "rb") as f:
+            f.seek(self.body_offset)
+            return f.read().decode("utf-8")
+
+
+class PostIndex:
+    """
+    Lookup structures over a snapshot of the corpus.
+
+    ``posts`` is ordered newest first by parsed date, ``by_slug`` maps a slug
+    to its post and ``neighbours`` maps a slug to its (previous, next) posts,
+    where previous is the next-older post and next the next-newer one.
+    """
+
+    def __init__(self, posts):
+        self.posts = sorted(
+            posts, key=lambda p: (p.published, p.slug), reverse=True
+        )
+        self.by_slug = {post["slug"]: post for post in self.posts}
+        self.neighbours = {}
+        for i, post in enumerate(self.posts):
+            prev_post = self.posts[i + 1] if i + 1 < len(self.posts) else None
+            next_post = self.posts[i - 1] if i > 0 else None
+            self.neighbours[post["slug"]] = (prev_post, next_post)
+
+    def __len__(self):
+        return len(self.posts)
+
+    def page_count(self, per_page=POSTS_PER_PAGE):
+        return max(1, math.ceil(len(self.posts) / per_page))
+
+    def page(self, number, per_page=POSTS_PER_PAGE):
+        """Return the posts on a 1-based listing page."""
+        start = (number - 1) * per_page
+        return self.posts[start:start + per_page]
+
+
+class PostCache:
+    """
+    In-memory cache of post metadata (PostMeta) keyed by source path.
+
+    Each entry remembers the file's (mtime, size) stamp; a file is re-read
+    only when its stamp changes. Files added to or removed from the content
+    directory are picked up on the next refresh without a restart. Scans are
+    throttled to one per ``refresh_interval`` seconds.
+    """
+
+    def __init__(self, content_dir, refresh_interval=POST_REFRESH_INTERVAL):
+        self.content_dir = Path(content_dir)
+        self.refresh_interval = refresh_interval
+        self.generation = 0
+        self.changed_at = 0
+        self.index = PostIndex([])
+        self._entries = {}
+        self._listeners = []
+        self._last_scan = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.index)
+
+    def add_listener(self, callback):
+        """Register a callback invoked with the set of changed slugs after a refresh."""
+        self._listeners.append(callback)
+
+    def last_modified(self, slugs):
+        """Return the newest source mtime (seconds) among the given slugs."""
+        by_slug = self.index.by_slug
+        return max((by_slug[slug].mtime for slug in slugs if slug in by_slug), default=0)
+
+    def page_modified(self, slugs):
+        """
+        Return the Last-Modified time of a page rendered now from the given slugs.
+
+        Source mtimes alone can go backwards (a deleted neighbour changes a
+        page but takes its mtime with it), so the time the index last
+        changed is included as well.
+        """
+        return max(self.last_modified(slugs), self.changed_at)
+
+    def refresh(self, force=False):
+        """Re-read changed files and return the current PostIndex."""
+        with self._lock:
+            now = time.monotonic()
+            if (
+                not force
+                and self._last_scan is not None
+                and now - self._last_scan < self.refresh_interval
+            ):
+                return self.index
+            self._last_scan = now
+
+            seen = set()
+            changed = set()
+
+            for path in self.content_dir.glob("*.md"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                stamp = (stat.st_mtime_ns, stat.st_size)
+                seen.add(path)
+
+                entry = self._entries.get(path)
+                if entry is not None and entry[0] == stamp:
+                    continue
+                try:
+                    post = read_post_meta(path)
+                except FileNotFoundError:
+                    seen.discard(path)
+                    continue
+                self._entries[path] = (stamp, post)
+                changed.add(post.slug)
+
+            for path in set(self._entries) - seen:
+                _, post = self._entries.pop(path)
+                changed.add(post.slug)
+
+            if changed:
+                # Publish the index before bumping the generation so that a
+                # reader never pairs a new generation with an old index
+                self.index = PostIndex(post for _, post in self._entries.values())
+                self.generation += 1
+                # Last-Modified has one-second resolution: always move it forward
+                self.changed_at = max(time.time(), self.changed_at + 1)
+                for callback in self._listeners:
+                    callback(changed)
+            return self.index
+
+
+class RenderedPage:
+    """
+    Final bytes of a rendered page together with its HTTP validators.
+
+    Compressed variants are produced once, when the page enters the cache,
+    and each encoding gets its own strong ETag.
+    """
+
+    __slots__ = (
+        "body", "variants", "etag", "etags", "modified", "last_modified", "slugs", "sources",
+        "media_type", "cache_control",
+    )
+
+    def __init__(
+        self,
+        body,
+        modified,
+        slugs,
+        variants=None,
+        media_type="text/html; charset=utf-8",
+        cache_control="no-cache",
+    ):
+        self.body = body
+        if variants is None:
+            with timed("compress"):
+                variants = compress_variants(body, PAGE_BROTLI_QUALITY)
+        self.variants = variants
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.etag = '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+        self.etags = {None: self.etag}
+        for encoding in self.variants:
+            self.etags[encoding] = f'{self.etag[:-1]}-{encoding}"'
+        self.modified = int(modified)
+        self.last_modified = formatdate(self.modified, usegmt=True)
+        self.slugs = tuple(slugs)
+        self.sources = frozenset(slugs)
+
+
+class PostBodyCache:
+    """
+    Bounded LRU cache of rendered post bodies.
+
+    Entries are (content, toc) pairs keyed by (slug, source digest), so an
+    edited post never hits a stale body. At most ``max_entries`` bodies are
+    kept, which bounds memory independently of the size of the corpus. On a
+    miss the persistent ``store`` (a RenderCache) is consulted before the
+    Markdown is converted.
+    """
+
+    def __init__(self, max_entries=POST_BODY_CACHE_SIZE, store=None):
+        self.max_entries = max_entries
+        self.store = store
+        self._bodies = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._bodies)
+
+    def get(self, post):
+        """Return the (content, toc) of a post, rendering it on a miss."""
+        key = (post.slug, post.digest)
+        with self._lock:
+            body = self._bodies.get(key)
+            if body is not None:
+                self._bodies.move_to_end(key)
+        record_cache("body", body is not None)
+        if body is not None:
+            return body
+
+        if self.store:
+            body = self.store.get(post.digest)
+            record_cache("render", body is not None)
+        if body is None:
+            with timed("io"):
+                data = post.path.read_bytes()
+            body = render_post_body(data[post.body_offset:].decode("utf-8"))
+            # Only persist bodies rendered from the source the digest describes
+            if self.store and fingerprint(data) == post.digest:
+                self.store.put(post.digest, body)
+        with self._lock:
+            self._bodies[key] = body
+            self._bodies.move_to_end(key)
+            while len(self._bodies) > self.max_entries:
+                self._bodies.popitem(last=False)
+        return body
+
+
+class PageCache:
+    """
+    Bounded LRU cache of rendered pages keyed by route.
+
+    Every entry records the slugs of the posts it was rendered from. Entries
+    whose posts change are dropped by ``discard``; entries marked with
+    ``ALL_POSTS`` (listings) are dropped on any change. Lookups may also pass
+    the expected slugs so that a page whose neighbours moved is re-rendered.
+    """
+
+    ALL_POSTS = "*"
+
+    def __init__(self, max_pages=PAGE_CACHE_SIZE):
+        self.max_pages = max_pages
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._pages)
+
+    def get(self, key, slugs=None):
+        with self._lock:
+            page = self._pages.get(key)
+            if page is None or (slugs is not None and page.slugs != tuple(slugs)):
+                return None
+            self._pages.move_to_end(key)
+        return page
+
+    def put(self, key, page, generation):
+        """Store a page unless the corpus changed while it was being rendered."""
+        with self._lock:
+            if generation == post_cache.generation:
+                self._pages[key] = page
+                self._pages.move_to_end(key)
+                while len(self._pages) > self.max_pages:
+                    self._pages.popitem(last=False)
+        return page
+
+    def discard(self, slugs):
+        """Drop every page rendered from any of the given slugs."""
+        with self._lock:
+            for key, page in list(self._pages.items()):
+                if self.ALL_POSTS in page.sources or page.sources & slugs:
+                    del self._pages[key]
+
+
+logger = logging.getLogger(__name__)
+
+RENDERER_VERSION = fingerprint(
+    repr(
+        (RENDERER_REVISION, markdown.__version__, CHART_EMBED_MODE, COLORS["gold"], COLORS["bg_card"])
+    ).encode("utf-8")
+)
+
+post_cache = PostCache(CONTENT_DIR)
+render_cache = RenderCache(RENDER_CACHE_PATH, RENDERER_VERSION) if RENDER_CACHE_PATH else None
+post_bodies = PostBodyCache(store=render_cache)
+section_renderer = SectionRenderer(
+    postprocess=lambda html_content: lazy_chart_embeds(
+        html_content, "/static/", CHART_EMBED_MODE, COLORS["gold"], COLORS["bg_card"]
+    ),
+    store=render_cache,
+    max_entries=SECTION_CACHE_SIZE,
+    on_lookup=lambda hit: record_cache("section", hit),
+    timed=timed,
+)
+page_cache = PageCache()
+post_cache.add_listener(page_cache.discard)
+asset_manifest = AssetManifest(STATIC_DIR, url_prefix="/static/")
+chart_assets = ChartAssets(STATIC_DIR, CHART_FLOAT_PRECISION, CHART_TYPED_ARRAYS)
+static_images = ResponsiveImages(asset_manifest, ImageVariants(IMAGE_CACHE_DIR))
+# Charts with plotly.js extracted and the shared scripts, by path under /static/
+chart_pages = {}
+render_executor = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix="render")
+_inflight_renders = {}
+
+
+def load_post_source(slug):
+    """Return the Markdown body of a post for the search index."""
+    post = post_cache.index.by_slug.get(slug)
+    if post is None:
+        return ""
+    try:
+        return post.read_body()
+    except FileNotFoundError:
+        return ""
+
+
+search_index = SearchIndex(load_post_source)
 
 
+def update_search_index(changed):
+    """Re-index changed posts and drop removed ones (a PostCache listener)."""
+    by_slug = post_cache.index.by_slug
+    for slug in changed:
+        post = by_slug.get(slug)
+        if post is None:
+            search_index.remove(slug)
+        else:
+            search_index.update(post)
+
+
+post_cache.add_listener(update_search_index)
+
+
+def load_chart_assets():
+    """Extract plotly.js from the charts in static/ and compact their figures (see blog_charts)."""
+    chart_assets.scan()
+    pages = {}
+    for rel, data in chart_assets.files.items():
+        original, compacted = chart_assets.sizes[rel]
+        logger.debug("Chart %s: %d -> %d bytes", rel, original, compacted)
+        pages[rel] = RenderedPage(data, (STATIC_DIR / rel).stat().st_mtime, ())
+        # Hashed chart URLs are immutable, so they must name the bytes served
+        asset_manifest.register(rel, data)
+    if chart_assets.sizes:
+        logger.info(
+            "Processed %d charts: %d -> %d bytes",
+            len(chart_assets.sizes),
+            sum(original for original, _ in chart_assets.sizes.values()),
+            sum(compacted for _, compacted in chart_assets.sizes.values()),
+        )
+    for name, data in chart_assets.scripts.items():
+        pages[name] = RenderedPage(
+            data,
+            time.time(),
+            (),
+            variants=compress_variants(data, CHART_SCRIPT_BROTLI_QUALITY),
+            media_type="text/javascript; charset=utf-8",
+            cache_control=IMMUTABLE_CACHE_CONTROL,
+        )
+    chart_pages.clear()
+    chart_pages.update(pages)
+
+
+class HashedStaticFiles(StaticFiles):
+    """
+    StaticFiles that also answers fingerprinted names from the asset manifest.
+
+    ``/static/<name>.<hash>.<ext>`` is served from ``<name>.<ext>`` with an
+    immutable Cache-Control header; plain names keep working for old links.
+    Charts found in ``charts`` (path -> RenderedPage) are served from there,
+    without their inlined plotly.js, and the WebP variants of ``images``
+    (a ResponsiveImages) are encoded on first request.
+    """
+
+    def __init__(self, *, manifest, charts, images, **kwargs):
+        super().__init__(**kwargs)
+        self.manifest = manifest
+        self.charts = charts
+        self.images = images
+
+    async def get_response(self, path, scope):
+        rel = path.replace(os.sep, "/")
+        original = self.manifest.resolve(rel)
+        chart = self.charts.get(original or rel)
+        if chart is not None:
+            response = page_response(Request(scope), chart)
+            if original is not None:
+                response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+            return response
+        if original is None and rel.endswith(".webp"):
+            loop = asyncio.get_running_loop()
+            variant = await loop.run_in_executor(render_executor, self.images.get, rel)
+            if variant is not None:
+                return Response(
+                    variant,
+                    media_type="image/webp",
+                    headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL},
+                )
+        if original is None:
+            return await super().get_response(path, scope)
+        response = await super().get_response(original, scope)
+        if response.status_code == 200:
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+class PrebuiltSite:
+    """
+    Route table of pages precomputed by build_site.py.
+
+    ``files`` maps output names (``index.html``, ``<slug>.html``,
+    ``theme.<hash>.css``, ...) to RenderedPages, ``built_at`` maps each
+    article slug to the time its page was built and ``neighbours`` maps it
+    to the (previous, next) slugs its page links to. A prebuilt page is only
+    served while its post and neighbours are unchanged since the build.
+    """
+
+    ENCODING_SUFFIXES = {"gzip": ".gz", "br": ".br"}
+    FINGERPRINTED_RE = re.compile(r"\.[0-9a-f]{10}\.\w+$")
+
+    def __init__(self):
+        self.files = {}
+        self.built_at = {}
+        self.neighbours = {}
+        self._fresh_generation = None
+        self._index_fresh = False
+
+    def __bool__(self):
+        return bool(self.files)
+
+    def _add(self, name, body, modified, variants=None):
+        media_type, _ = mimetypes.guess_type(name)
+        media_type = media_type or "application/octet-stream"
+        if media_type.startswith("text/"):
+            media_type += "; charset=utf-8"
+        cache_control = (
+            IMMUTABLE_CACHE_CONTROL if self.FINGERPRINTED_RE.search(name) else "no-cache"
+        )
+        self.files[name] = RenderedPage(
+            body,
+            modified,
+            (),
+            variants=variants,
+            media_type=media_type,
+            cache_control=cache_control,
+        )
+        if name.endswith(".html") and name != "index.html":
+            self.built_at[name[:-5]] = modified
+
+    def load(self, site_dir):
+        """Load a site directory written by build_site.py, with its .gz/.br variants."""
+        suffixes = tuple(self.ENCODING_SUFFIXES.values())
+        for path in sorted(Path(site_dir).iterdir()):
+            if not path.is_file() or path.name.startswith(".") or path.name.endswith(suffixes):
+                continue
+            variants = {}
+            for encoding, suffix in self.ENCODING_SUFFIXES.items():
+                compressed = path.with_name(path.name + suffix)
+                if compressed.exists():
+                    variants[encoding] = compressed.read_bytes()
+            self._add(path.name, path.read_bytes(), path.stat().st_mtime, variants)
+        # The build manifest lists the posts the pages were built from
+        try:
+            manifest = json.loads((Path(site_dir) / build_site.MANIFEST_NAME).read_text(encoding="utf-8"))
+            posts = [{"slug": slug, "date": post["date"]} for slug, post in manifest["posts"].items()]
+        except (OSError, ValueError, KeyError, TypeError):
+            logger.warning("No build manifest in %s; prebuilt articles are not used", site_dir)
+            posts = []
+        self._set_neighbours(build_site.newest_first(posts))
+        return self
+
+    def build(self, content_dir):
+        """Run build_site.py's renderer in memory."""
+        built_at = time.time()
+        posts = build_site.load_posts(sorted(Path(content_dir).glob("*.md")), verbose=False)
+        for name, html in build_site.render_pages(posts).items():
+            self._add(name, html, built_at)
+        self._set_neighbours(posts)
+        self._add(build_site.THEME_CSS_NAME, build_site.THEME_CSS, built_at)
+        for name in build_site.ROOT_STATIC_FILES:
+            path = STATIC_DIR / name
+            if path.exists():
+                self._add(name, path.read_bytes(), path.stat().st_mtime)
+        return self
+
+    def _set_neighbours(self, posts):
+        # Same (previous, next) pairing as build_site.render_pages()
+        slugs = [post["slug"] for post in posts]
+        self.neighbours = {
+            slug: (
+                slugs[i + 1] if i + 1 < len(slugs) else None,
+                slugs[i - 1] if i > 0 else None,
+            )
+            for i, slug in enumerate(slugs)
+        }
+
+    def is_fresh(self, slug):
+        """True if the post still exists, links to the same neighbours and none changed since the build."""
+        built_at = self.built_at.get(slug)
+        index = post_cache.index
+        if built_at is None or slug not in index.by_slug:
+            return False
+        neighbours = tuple(post["slug"] if post else None for post in index.neighbours[slug])
+        if neighbours != self.neighbours.get(slug):
+            return False
+        # The page shows its neighbours' titles, so their edits count too
+        return post_cache.last_modified([slug, *filter(None, neighbours)]) <= built_at
+
+    def index_is_fresh(self):
+        """True if the prebuilt index still lists exactly the current posts."""
+        generation = post_cache.generation
+        if self._fresh_generation != generation:
+            slugs = post_cache.index.by_slug.keys()
+            self._index_fresh = slugs == self.built_at.keys() and all(
+                self.is_fresh(slug) for slug in slugs
+            )
+            self._fresh_generation = generation
+        return self._index_fresh
+
+
+prebuilt_site = PrebuiltSite()
+
+
+async def poll_content():
+    """Pick up added, changed and deleted posts in the background, off the event loop."""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(post_cache.refresh_interval)
+        try:
+            await loop.run_in_executor(render_executor, post_cache.refresh, True)
+        except Exception:
+            logger.exception("Refreshing posts from %s failed", post_cache.content_dir)
+
+
+async def render_off_loop(key, render, *args):
+    """
+    Run a page render in the bounded render executor.
+
+    Concurrent requests for the same key share one in-flight render.
+    """
+    future = _inflight_renders.get(key)
+    if future is None:
+        loop = asyncio.get_running_loop()
+        # Run in a copy of the request's context so that its phases are timed
+        context = contextvars.copy_context()
+        future = loop.run_in_executor(render_executor, context.run, render, *args)
+        _inflight_renders[key] = future
+
+        def forget(done):
+            if _inflight_renders.get(key) is done:
+                del _inflight_renders[key]
+
+        future.add_done_callback(forget)
+    # Shield so that one client disconnecting does not cancel the shared render
+    return await asyncio.shield(future)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Prime the post cache, asset manifest, images and charts, then keep the posts fresh."""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(render_executor, asset_manifest.scan)
+    await loop.run_in_executor(render_executor, static_images.scan)
+    await loop.run_in_executor(render_executor, load_chart_assets)
+    await loop.run_in_executor(render_executor, post_cache.refresh, True)
+    if SITE_MODE == "prebuilt":
+        await loop.run_in_executor(render_executor, prebuilt_site.load, SITE_DIR)
+    elif SITE_MODE == "memory":
+        await loop.run_in_executor(render_executor, prebuilt_site.build, CONTENT_DIR)
+    poller = asyncio.create_task(poll_content())
+    yield
+    poller.cancel()
+
+
+app = FastAPI(
+    title=SITE_TITLE,
+    description="Dynamic Finance Blog powered by Python",
+    lifespan=lifespan,
+)
+app.add_middleware(ServerTimingMiddleware)
+
 
 def get_base_css():
     """Return the complete CSS for the finance-themed blog."""
@@ -241,6 +905,10 @@ def get_base_css():
         .article-content li {{
             margin-bottom: 8px;
         }}
+        .article-content img {{
+            max-width: 100%;
+            height: auto;
+        }}
         .article-content code {{
             background-color: {COLORS['bg_dark']};
             padding: 2px 8px;
@@ -327,6 +995,54 @@ def get_base_css():
         .article-nav a:hover {{
             border-color: {COLORS['gold']};
         }}
+        .pagination {{
+            display: flex;
+            justify-content: space-between;
+            align-items: center;
+            gap: 20px;
+            margin-top: 36px;
+        }}
+        .pagination .page-status {{
+            color: {COLORS['text_secondary']};
+            font-size: 0.9rem;
+        }}
+        .search-form {{
+            display: flex;
+            gap: 12px;
+            margin-bottom: 32px;
+        }}
+        .search-form input {{
+            flex: 1;
+            padding: 12px 16px;
+            font-size: 1rem;
+            color: {COLORS['text_primary']};
+            background-color: {COLORS['bg_card']};
+            border: 1px solid {COLORS['border']};
+            border-radius: 8px;
+        }}
+        .search-form button {{
+            padding: 12px 24px;
+            font-weight: 600;
+            color: {COLORS['bg_nav']};
+            background-color: {COLORS['gold']};
+            border: none;
+            border-radius: 8px;
+            cursor: pointer;
+        }}
+        .search-status {{
+            color: {COLORS['text_secondary']};
+            margin-bottom: 24px;
+        }}
+        .search-snippet {{
+            color: {COLORS['text_secondary']};
+            margin-top: 8px;
+        }}
+        .search-snippet mark {{
+            color: {COLORS['bg_nav']};
+            background-color: {COLORS['gold_light']};
+            padding: 0 2px;
+            border-radius: 2px;
+        }}
         footer {{
             background-color: {COLORS['bg_nav']};
             padding: 32px 0;
@@ -451,19 +1167,32 @@ def get_base_css():
     """
 
 
-def parse_markdown_file(filepath):
-    """Parse a Markdown file and extract metadata and content."""
-    with open(filepath, "r", encoding="utf-8") as f:
-        content = f.read()
+# Theme stylesheet, built and minified once at startup and served under a
+# content-hashed URL so browsers can cache it forever.
+THEME_CSS = minify_css(get_base_css()).encode("utf-8")
+THEME_CSS_HASH = fingerprint(THEME_CSS)
+THEME_CSS_URL = "/static/" + hashed_name("theme.css", THEME_CSS_HASH)
+THEME_CSS_VARIANTS = compress_variants(THEME_CSS)
 
-    lines = content.split("\n")
+
+def read_post_meta(filepath):
+    """
+    Read a post's header lines (title, date, author) into a PostMeta.
+
+    Only the first lines are decoded; the body is located by its byte offset
+    and fingerprinted, but not converted.
+    """
+    path = Path(filepath)
+    with timed("io"):
+        data = path.read_bytes()
     title = ""
     date = ""
     author = ""
-    content_start = 0
+    body_offset = 0
+    offset = 0
 
-    for i, line in enumerate(lines):
-        stripped = line.strip()
+    for i, line in enumerate(data.split(b"\n", 16)[:16]):
+        stripped = line.decode("utf-8").strip()
         if stripped.startswith("# "):
             title = stripped[2:].strip()
         elif stripped.lower().startswith("date:"):
@@ -471,47 +1200,57 @@ def parse_markdown_file(filepath):
         elif stripped.lower().startswith("author:"):
             author = stripped[7:].strip()
         elif stripped == "" and title and date and author:
-            content_start = i + 1
+            body_offset = offset + len(line) + 1
             break
         elif i > 10:
-            content_start = 0
             break
+        offset += len(line) + 1
 
-    main_content = "\n".join(lines[content_start:])
-    md = markdown.Markdown(extensions=["extra", "toc"])
-    html_content = md.convert(main_content)
-    toc = getattr(md, "toc", "")
-    slug = Path(filepath).stem
-
-    return {
-        "title": title or slug.replace("-", " ").title(),
-        "date": date or datetime.now().strftime("%Y-%m-%d"),
-        "author": author or "Anonymous",
-        "content": html_content,
-        "toc": toc,
-        "slug": slug,
-    }
+    post = PostMeta()
+    post.slug = path.stem
+    post.title = title or post.slug.replace("-", " ").title()
+    post.date = date or datetime.now().strftime("%Y-%m-%d")
+    post.author = author or "Anonymous"
+    post.published = build_site.parse_post_date(post.date)
+    post.path = path
+    post.body_offset = body_offset
+    post.digest = fingerprint(data)
+    post.mtime = path.stat().st_mtime
+    return post
+
+
+def render_post_body(source):
+    """
+    Convert a post's Markdown body and return its (content, toc) HTML.
+
+    Only sections that are not in the section cache are converted.
+    """
+    with timed("markdown"):
+        return section_renderer.render(source)
 
 
 def get_all_posts():
-    """Get all blog posts from the content directory."""
-    md_files = list(CONTENT_DIR.glob("*.md"))
-    posts = [parse_markdown_file(f) for f in md_files]
-    return sorted(posts, key=lambda x: x["date"], reverse=True)
+    """Get all blog posts from the content directory, re-parsing only changed files."""
+    return post_cache.refresh().posts
 
 
-def generate_html_page(title, body_content, page_type="article"):
-    """Generate a complete HTML page with the finance theme."""
-    css = get_base_css()
-    
+def compile_page_shell(page_type="article"):
+    """
+    Build the static parts of the page shell for one navigation variant.
+
+    Returns the minified (head, header, footer) byte segments; a page is the
+    join of head + title + header + body + footer.
+    """
     # Navigation bar with links
     nav_class_home = "active" if page_type == "index" else ""
     nav_class_articles = "active" if page_type == "article" else ""
+    nav_class_search = "active" if page_type == "search" else ""
     
     nav_bar = f"""
     <nav class="main-nav">
         <a href="/" class="{nav_class_home}">Home</a>
         <a href="/#articles" class="{nav_class_articles}">Articles</a>
+        <a href="/search" class="{nav_class_search}">Search</a>
         <a href="/#contact">Contact</a>
     </nav>
     """
@@ -546,14 +1285,15 @@ def generate_html_page(title, body_content, page_type="article"):
     </section>
     """
 
-    return f"""<!DOCTYPE html>
+    head = f"""<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title} | {SITE_TITLE}</title>
+    <title>"""
+    header = f""" | {SITE_TITLE}</title>
     <link rel="icon" type="image/svg+xml" href="/static/favicon.svg">
-    <style>{css}</style>
+    <link rel="stylesheet" href="{THEME_CSS_URL}">
 </head>
 <body>
     <header>
@@ -565,7 +1305,8 @@ def generate_html_page(title, body_content, page_type="article"):
             {nav_bar}
         </div>
     </header>
-    {body_content}
+    """
+    footer = f"""
     {contact_section}
     <footer>
         <div class="container">
@@ -575,13 +1316,114 @@ def generate_html_page(title, body_content, page_type="article"):
     </footer>
 </body>
 </html>"""
+    return tuple(minify_html(part).encode("utf-8") for part in (head, header, footer))
 
 
-@app.get("/", response_class=HTMLResponse)
-async def home():
-    """Serve the homepage with list of all posts."""
-    posts = get_all_posts()
+# Page shells are compiled once per navigation variant (None = no active link)
+PAGE_SHELLS = {
+    page_type: compile_page_shell(page_type)
+    for page_type in ("index", "article", "search", None)
+}
+
+
+def generate_html_page(title, body_content, page_type="article"):
+    """Generate a complete, minified HTML page (UTF-8 bytes) with the finance theme."""
+    head, header, footer = PAGE_SHELLS.get(page_type) or PAGE_SHELLS[None]
+    with timed("assemble"):
+        body = minify_html(body_content).encode("utf-8")
+        return b"".join((head, title.encode("utf-8"), header, body, footer))
+
+
+def is_not_modified(request, page):
+    """Evaluate If-None-Match / If-Modified-Since against a rendered page."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        etags = set(page.etags.values())
+        return "*" in tags or any(
+            (tag[2:] if tag.startswith("W/") else tag) in etags for tag in tags
+        )
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return since.timestamp() >= page.modified
+    return False
+
+
+def page_response(request, page):
+    """Build a 200 or 304 response for a rendered page in the best accepted encoding."""
+    encoding = choose_encoding(request.headers.get("accept-encoding"), page.variants)
+    headers = {
+        "ETag": page.etags[encoding],
+        "Last-Modified": page.last_modified,
+        "Cache-Control": page.cache_control,
+        "Vary": "Accept-Encoding",
+    }
+    if is_not_modified(request, page):
+        return Response(status_code=304, headers=headers)
+
+    body = page.body
+    if encoding:
+        body = page.variants[encoding]
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type=page.media_type, headers=headers)
+
+
+def render_pagination(number, page_count):
+    """Render newer/older links between listing pages."""
+    if page_count <= 1:
+        return ""
+
+    newer_link = "<span></span>"
+    if number > 1:
+        newer_href = "/" if number == 2 else f"/page/{number - 1}"
+        newer_link = f'<a href="{newer_href}">&larr; Newer posts</a>'
+    older_link = "<span></span>"
+    if number < page_count:
+        older_link = f'<a href="/page/{number + 1}">Older posts &rarr;</a>'
+
+    return f"""
+            <nav class="pagination">
+                {newer_link}
+                <span class="page-status">Page {number} of {page_count}</span>
+                {older_link}
+            </nav>
+            """
+
+
+def home_page_key(number):
+    """Return the cache key and source slugs of a listing page (404 if out of range)."""
+    if number < 1 or number > post_cache.index.page_count():
+        raise HTTPException(status_code=404, detail="Page not found")
+    return f"index:{number}", None
 
+
+def article_page_key(slug):
+    """Return the cache key and source slugs (post, previous, next) of an article."""
+    index = post_cache.index
+    post = index.by_slug.get(slug)
+    if not post:
+        raise HTTPException(status_code=404, detail="Article not found")
+    prev_post, next_post = index.neighbours[slug]
+    # Neighbours are part of the page, so a cached copy is only valid while they match
+    return "article:" + slug, tuple(p["slug"] if p else None for p in (post, prev_post, next_post))
+
+
+def render_home_page(number=1):
+    """Render a listing page, reusing the cached bytes when no post changed."""
+    generation = post_cache.generation
+    index = post_cache.index
+    key, _ = home_page_key(number)
+    cached = page_cache.get(key)
+    if cached is not None:
+        return cached
+
+    page_count = index.page_count()
+    posts = index.page(number)
     posts_html = ""
     for post in posts:
         posts_html += f"""
@@ -606,43 +1448,64 @@ async def home():
             <div class="posts-list">
                 {posts_html}
             </div>
+            {render_pagination(number, page_count)}
         </div>
     </main>
     """
 
-    return generate_html_page(SITE_TITLE, body, page_type="index")
+    title = SITE_TITLE if number == 1 else f"Page {number}"
+    html = generate_html_page(title, body, page_type="index")
+    page = RenderedPage(
+        html,
+        # Any added or deleted post can move posts between listing pages
+        post_cache.changed_at,
+        [PageCache.ALL_POSTS],
+    )
+    return page_cache.put(key, page, generation)
 
 
-@app.get("/article/{slug}", response_class=HTMLResponse)
-async def article(slug: str):
-    """Serve an individual article page."""
-    posts = get_all_posts()
-    
-    # Find the requested post
-    post = None
-    post_index = -1
-    for i, p in enumerate(posts):
-        if p["slug"] == slug:
-            post = p
-            post_index = i
-            break
-    
-    if not post:
-        raise HTTPException(status_code=404, detail="Article not found")
+def article_body_parts(index, slug):
+    """
+    Yield the HTML of an article page's body in document order.
 
-    # Get prev/next posts for navigation
-    prev_post = posts[post_index + 1] if post_index + 1 < len(posts) else None
-    next_post = posts[post_index - 1] if post_index > 0 else None
+    The breadcrumb, article header and TOC come first so that a streamed
+    response can send them before the article content is ready.
+    """
+    post = index.by_slug[slug]
+    prev_post, next_post = index.neighbours[slug]
 
+    content, toc = post_bodies.get(post)
     toc_html = ""
-    if post["toc"]:
+    if toc:
         toc_html = f"""
         <div class="toc">
             <h2>Table of Contents</h2>
-            {post['toc']}
+            {toc}
         </div>
         """
 
+    yield f"""
+    <main>
+        <div class="container">
+            <div class="breadcrumb">
+                <a href="/">Home</a>
+                <span>&raquo;</span>
+                <span>{post['title']}</span>
+            </div>
+            <article class="article">
+                <header class="article-header">
+                    <div class="article-meta">
+                        <span class="date">{post['date']}</span>
+                        &bull; By <strong>{post['author']}</strong>
+                    </div>
+                    <h1>{post['title']}</h1>
+                </header>
+                {toc_html}
+                <div class="article-content">
+                    """
+
+    yield responsive_images(asset_manifest.rewrite(content), static_images.lookup)
+
     nav_links = ""
     if prev_post or next_post:
         prev_link = (
@@ -662,36 +1525,277 @@ async def article(slug: str):
         </div>
         """
 
+    yield f"""
+                </div>
+                {nav_links}
+            </article>
+        </div>
+    </main>
+    """
+
+
+def render_article_page(slug):
+    """Render an article page, reusing the cached bytes when its posts are unchanged."""
+    generation = post_cache.generation
+    index = post_cache.index
+    key, slugs = article_page_key(slug)
+    cached = page_cache.get(key, slugs)
+    if cached is not None:
+        return cached
+
+    body = "".join(article_body_parts(index, slug))
+    html = generate_html_page(index.by_slug[slug]["title"], body, page_type="article")
+    page = RenderedPage(html, post_cache.page_modified(slugs), slugs)
+    return page_cache.put(key, page, generation)
+
+
+def stream_article_page(key, slugs, slug):
+    """
+    Stream an article page that is not cached yet.
+
+    The document head, stylesheet link and site header are sent at once;
+    the body is rendered part by part in the render executor and sent as
+    each part is produced. The render runs as a task registered as the
+    key's in-flight render, so concurrent requests for the page await the
+    finished page instead of rendering it again, and a client going away
+    does not stop it. The finished page is then added to the cache.
+    """
+    loop = asyncio.get_running_loop()
+    generation = post_cache.generation
+    index = post_cache.index
+    head, header, footer = PAGE_SHELLS["article"]
+    title = index.by_slug[slug]["title"].encode("utf-8")
+    queue = asyncio.Queue()
+
+    async def render():
+        sent = [head + title + header]
+        try:
+            parts = article_body_parts(index, slug)
+            # Each step runs in a copy of the request's context so that its phases are timed
+            context = contextvars.copy_context()
+            while True:
+                part = await loop.run_in_executor(render_executor, context.run, next, parts, None)
+                if part is None:
+                    break
+                with timed("assemble"):
+                    sent.append(minify_html(part).encode("utf-8"))
+                queue.put_nowait(sent[-1])
+        except BaseException:
+            # Tell the streaming client that the page is incomplete
+            queue.put_nowait(None)
+            raise
+        sent.append(footer)
+        queue.put_nowait(footer)
+        page = await loop.run_in_executor(
+            render_executor,
+            RenderedPage,
+            b"".join(sent),
+            post_cache.page_modified(slugs),
+            slugs,
+        )
+        return page_cache.put(key, page, generation)
+
+    task = loop.create_task(render())
+    _inflight_renders[key] = task
+
+    def forget(done):
+        if _inflight_renders.get(key) is done:
+            del _inflight_renders[key]
+        if not done.cancelled():
+            # Requests awaiting the page see a failure; none may be waiting
+            done.exception()
+
+    task.add_done_callback(forget)
+
+    async def chunks():
+        yield head + title + header
+        while True:
+            chunk = await queue.get()
+            if chunk is None:
+                # Abort the response rather than end a truncated page normally
+                raise RuntimeError(f"Rendering article {slug!r} failed")
+            yield chunk
+            if chunk is footer:
+                break
+
+    return StreamingResponse(
+        chunks(),
+        media_type="text/html; charset=utf-8",
+        headers={
+            "Cache-Control": "no-cache",
+            "Last-Modified": formatdate(int(post_cache.page_modified(slugs)), usegmt=True),
+        },
+    )
+
+
+async def serve_page(request, key, slugs, render, *args):
+    """Answer from the page cache, rendering off the event loop on a miss."""
+    page = page_cache.get(key, slugs)
+    record_cache("page", page is not None)
+    if page is None:
+        page = await render_off_loop(key, render, *args)
+    return page_response(request, page)
+
+
+@app.get("/", response_class=HTMLResponse)
+async def home(request: Request):
+    """Serve the homepage with the newest posts."""
+    if prebuilt_site and prebuilt_site.index_is_fresh():
+        return page_response(request, prebuilt_site.files["index.html"])
+    key, slugs = home_page_key(1)
+    return await serve_page(request, key, slugs, render_home_page, 1)
+
+
+@app.get("/page/{number}", response_class=HTMLResponse)
+async def listing_page(number: int, request: Request):
+    """Serve an older page of the post listing."""
+    key, slugs = home_page_key(number)
+    return await serve_page(request, key, slugs, render_home_page, number)
+
+
+@app.get("/article/{slug}", response_class=HTMLResponse)
+async def article(slug: str, request: Request):
+    """Serve an individual article page."""
+    if prebuilt_site and prebuilt_site.is_fresh(slug):
+        # Prebuilt pages use links relative to the site root. The redirect is
+        # temporary: once the post is edited, this URL renders dynamically again
+        return RedirectResponse(f"/{slug}.html", status_code=307)
+    key, slugs = article_page_key(slug)
+    # Conditional requests are answered from the finished page (ETag / 304)
+    conditional = "if-none-match" in request.headers or "if-modified-since" in request.headers
+    if (
+        STREAM_ARTICLES
+        and not conditional
+        and key not in _inflight_renders
+        and page_cache.get(key, slugs) is None
+    ):
+        record_cache("page", False)
+        return stream_article_page(key, slugs, slug)
+    return await serve_page(request, key, slugs, render_article_page, slug)
+
+
+@app.get("/static/theme.{digest}.css")
+async def theme_css(digest: str, request: Request):
+    """Serve the fingerprinted theme stylesheet with immutable caching."""
+    if digest != THEME_CSS_HASH:
+        raise HTTPException(status_code=404, detail="Stylesheet not found")
+
+    encoding = choose_encoding(request.headers.get("accept-encoding"), THEME_CSS_VARIANTS)
+    headers = {
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        "ETag": f'"{THEME_CSS_HASH}-{encoding}"' if encoding else f'"{THEME_CSS_HASH}"',
+        "Vary": "Accept-Encoding",
+    }
+    body = THEME_CSS
+    if encoding:
+        body = THEME_CSS_VARIANTS[encoding]
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type="text/css; charset=utf-8", headers=headers)
+
+
+def render_search_page(query):
+    """Render the search form and the ranked results for a query."""
+    results, total, exact = [], 0, True
+    if query:
+        with timed("search"):
+            results, total, exact = search_index.search(query, limit=SEARCH_RESULTS)
+    results_html = ""
+    for result in results:
+        results_html += f"""
+        <article class="post-card">
+            <span class="post-date">{result['date']}</span>
+            <h2 class="post-title">
+                <a href="/article/{result['slug']}">{result['title']}</a>
+            </h2>
+            <p class="post-author">By <strong>{result['author']}</strong></p>
+            <p class="search-snippet">{result['snippet']}</p>
+        </article>
+        """
+
+    status = ""
+    if query:
+        about = "" if exact else "About "
+        shown = f" (showing the top {len(results)})" if total > len(results) else ""
+        status = f'<p class="search-status">{about}{total} result{"" if total == 1 else "s"} for <strong>{html.escape(query)}</strong>{shown}</p>'
+
     body = f"""
     <main>
         <div class="container">
-            <div class="breadcrumb">
-                <a href="/">Home</a>
-                <span>&raquo;</span>
-                <span>{post['title']}</span>
+            <form class="search-form" action="/search" method="get" role="search">
+                <input type="search" name="q" value="{html.escape(query)}" placeholder="Search articles, e.g. &quot;labor market&quot;" aria-label="Search articles">
+                <button type="submit">Search</button>
+            </form>
+            {status}
+            <div class="posts-list">
+                {results_html}
             </div>
-            <article class="article">
-                <header class="article-header">
-                    <div class="article-meta">
-                        <span class="date">{post['date']}</span>
-                        &bull; By <strong>{post['author']}</strong>
-                    </div>
-                    <h1>{post['title']}</h1>
-                </header>
-                {toc_html}
-                <div class="article-content">
-                    {post['content']}
-                </div>
-                {nav_links}
-            </article>
         </div>
     </main>
     """
+    title = f"Search: {html.escape(query)}" if query else "Search"
+    return generate_html_page(title, body, page_type="search")
+
+
+@app.get("/search", response_class=HTMLResponse)
+async def search(q: str = ""):
+    """Full-text search over titles, authors and article text."""
+    query = q.strip()[:200]
+    # Ranking and snippets run in the render executor, off the event loop
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    page = await loop.run_in_executor(render_executor, context.run, render_search_page, query)
+    return Response(
+        page,
+        media_type="text/html; charset=utf-8",
+        headers={"Cache-Control": "no-cache"},
+    )
 
-    return generate_html_page(post["title"], body, page_type="article")
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Phase and request duration histograms and cache counters (Prometheus text format)."""
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 @app.get("/health")
 async def health():
-    """Health check endpoint."""
-    return {"status": "healthy", "posts": len(get_all_posts())}
+    """Health check endpoint (reports the cached post count without touching disk)."""
+    return {"status": "healthy", "posts": len(post_cache)}
+
+
+@app.get("/{name}")
+async def prebuilt_file(name: str, request: Request):
+    """Serve a page or file from the prebuilt site's route table."""
+    if not prebuilt_site:
+        raise HTTPException(status_code=404, detail="Not found")
+    if name == "index.html":
+        return await home(request)
+
+    slug = name[:-5] if name.endswith(".html") else None
+    if slug in prebuilt_site.built_at and slug not in post_cache.index.by_slug:
+        # The post was deleted after the build
+        raise HTTPException(status_code=404, detail="Not found")
+    if slug in post_cache.index.by_slug and not prebuilt_site.is_fresh(slug):
+        # The post is newer than the build: render it dynamically
+        key, slugs = article_page_key(slug)
+        return await serve_page(request, key, slugs, render_article_page, slug)
+
+    page = prebuilt_site.files.get(name)
+    if page is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return page_response(request, page)
+
+
+# Mount static files directory (after the routes above so that the
+# fingerprinted stylesheet route takes precedence over the mount)
+if STATIC_DIR.exists():
+    app.mount(
+        "/static",
+        HashedStaticFiles(
+            directory=str(STATIC_DIR),
+            manifest=asset_manifest,
+            charts=chart_pages,
+            images=static_images,
+        ),
+        name="static",
+    )
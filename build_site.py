@@ -6,20 +6,91 @@ A 100% Python-powered static site generator for a finance-themed blog.
 No hand-authored HTML or JavaScript - all output is generated by Python.
 
 Uses the Python markdown package to convert Markdown files to HTML.
+
+Builds are incremental: a manifest in the output directory records the
+content hash of every source and the dependencies of every page, so only
+pages whose inputs changed are re-rendered and only changed bytes are
+written. Use --force for a full rebuild and --jobs N to parse and render
+on N processes. --watch rebuilds on every change to content/ or static/ and
+serves the site with live reload.
 """
 
+import argparse
+import filecmp
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 
 import markdown
 
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from blog_assets import (
+    ENCODINGS,
+    compress_variants,
+    file_fingerprint,
+    fingerprint,
+    hashed_name,
+    minify_css,
+    minify_html,
+)
+from blog_cache import RenderCache
+from blog_charts import PlotlyExtractor, compact_chart
+from blog_images import (
+    IMAGE_WIDTHS,
+    RASTER_SUFFIXES,
+    WEBP_QUALITY,
+    Image,
+    ImageVariants,
+    image_size,
+    variant_name,
+)
+from blog_markdown import SectionRenderer, lazy_chart_embeds, responsive_images
+
 
 # Configuration
 CONTENT_DIR = Path("content")
 OUTPUT_DIR = Path("site")
 STATIC_DIR = Path("static")
+# Files from STATIC_DIR that pages reference from the site root
+ROOT_STATIC_FILES = ("favicon.svg", "logo.png")
 SITE_TITLE = "Finance Insights Blog"
 SITE_TAGLINE = "Your trusted source for market analysis and financial news"
+# Chart iframes: "click" (placeholder, load on click) or "lazy" (load on scroll)
+CHART_EMBED_MODE = "click"
+# Chart figure data: round floats to this many significant digits (None keeps
+# them exact) and store numeric arrays as typed arrays where that is shorter
+CHART_FLOAT_PRECISION = None
+CHART_TYPED_ARRAYS = True
+# Encoded WebP variants of images, kept across builds by source hash
+IMAGE_CACHE_DIR = Path(".cache/images")
+# Converted Markdown sections, kept across builds by source hash (None disables it)
+SECTION_CACHE_PATH = Path(".cache/build-sections.sqlite3")
+# Build manifest written to OUTPUT_DIR for incremental builds
+MANIFEST_NAME = ".build-manifest.json"
+# Bump whenever a change to the page renderers changes their output
+RENDERER_REVISION = 6
+# Subdirectory of OUTPUT_DIR for the assets that articles reference
+ASSET_OUTPUT_DIR = "static"
+# --watch: seconds between scans of CONTENT_DIR/STATIC_DIR, and the preview port
+WATCH_INTERVAL = 0.25
+PREVIEW_PORT = 8080
+# Accepted formats of a post's date line, tried in order
+DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%B %d, %Y", "%b %d, %Y", "%d %B %Y")
 
 
 # Elegant Finance-themed color palette
@@ -234,6 +305,10 @@ def get_base_css():
         .article-content li {{
             margin-bottom: 8px;
         }}
+        .article-content img {{
+            max-width: 100%;
+            height: auto;
+        }}
         .article-content code {{
             background-color: {COLORS['bg_dark']};
             padding: 2px 8px;
@@ -444,7 +519,13 @@ def get_base_css():
     """
 
 
-def parse_markdown_file(filepath):
+# Theme stylesheet, built and minified once per build and written under a
+# content-hashed file name that pages reference with a <link>.
+THEME_CSS = minify_css(get_base_css()).encode("utf-8")
+THEME_CSS_NAME = hashed_name("theme.css", fingerprint(THEME_CSS))
+
+
+def parse_markdown_file(filepath, timings=None):
     """
     Parse a Markdown file and extract metadata and content.
 
@@ -454,7 +535,12 @@ def parse_markdown_file(filepath):
         author: Author Name
 
         Content starts here...
+
+    If ``timings`` is a dict, the seconds spent reading and parsing the
+    header and converting the Markdown are added to its "parse" and
+    "markdown" entries.
     """
+    started = time.perf_counter()
     with open(filepath, "r", encoding="utf-8") as f:
         content = f.read()
 
@@ -482,13 +568,16 @@ def parse_markdown_file(filepath):
 
     # Get the main content (after metadata)
     main_content = "\n".join(lines[content_start:])
+    parsed = time.perf_counter()
 
-    # Convert markdown to HTML
-    md = markdown.Markdown(extensions=["extra", "toc"])
-    html_content = md.convert(main_content)
+    # Convert markdown to HTML and extract the table of contents, reusing
+    # the sections that are unchanged since an earlier build
+    html_content, toc = section_renderer.render(main_content)
 
-    # Extract table of contents
-    toc = getattr(md, "toc", "")
+    if timings is not None:
+        finished = time.perf_counter()
+        timings["parse"] = timings.get("parse", 0.0) + parsed - started
+        timings["markdown"] = timings.get("markdown", 0.0) + finished - parsed
 
     # Generate slug from filename
     slug = Path(filepath).stem
@@ -503,10 +592,13 @@ def parse_markdown_file(filepath):
     }
 
 
-def generate_html_page(title, body_content, page_type="article"):
-    """Generate a complete HTML page with the finance theme."""
-    css = get_base_css()
+def compile_page_shell(page_type="article"):
+    """
+    Build the static parts of the page shell for one navigation variant.
 
+    Returns the minified (head, header, footer) byte segments; a page is the
+    join of head + title + header + body + footer.
+    """
     # Navigation bar with links
     nav_class_home = "active" if page_type == "index" else ""
     nav_class_articles = "active" if page_type == "article" else ""
@@ -549,14 +641,15 @@ def generate_html_page(title, body_content, page_type="article"):
     </section>
     """
 
-    return f"""<!DOCTYPE html>
+    head = f"""<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title} | {SITE_TITLE}</title>
+    <title>"""
+    header = f""" | {SITE_TITLE}</title>
     <link rel="icon" type="image/svg+xml" href="favicon.svg">
-    <style>{css}</style>
+    <link rel="stylesheet" href="{THEME_CSS_NAME}">
 </head>
 <body>
     <header>
@@ -568,7 +661,8 @@ def generate_html_page(title, body_content, page_type="article"):
             {nav_bar}
         </div>
     </header>
-    {body_content}
+    """
+    footer = f"""
     {contact_section}
     <footer>
         <div class="container">
@@ -578,12 +672,40 @@ def generate_html_page(title, body_content, page_type="article"):
     </footer>
 </body>
 </html>"""
+    return tuple(minify_html(part).encode("utf-8") for part in (head, header, footer))
+
+
+# Page shells are compiled once per navigation variant (None = no active link)
+PAGE_SHELLS = {
+    page_type: compile_page_shell(page_type) for page_type in ("index", "article", None)
+}
+
+
+def generate_html_page(title, body_content, page_type="article"):
+    """Generate a complete, minified HTML page (UTF-8 bytes) with the finance theme."""
+    head, header, footer = PAGE_SHELLS.get(page_type) or PAGE_SHELLS[None]
+    body = minify_html(body_content).encode("utf-8")
+    return b"".join((head, title.encode("utf-8"), header, body, footer))
+
+
+def parse_post_date(value):
+    """Parse a post's date string; unparseable dates sort as the oldest."""
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return datetime.min
+
+
+def newest_first(posts):
+    """Sort posts by parsed date, newest first, in the same order as blog_server."""
+    return sorted(posts, key=lambda x: (parse_post_date(x["date"]), x["slug"]), reverse=True)
 
 
 def generate_index_html(posts):
     """Generate the index.html homepage."""
-    # Sort posts by date (newest first)
-    sorted_posts = sorted(posts, key=lambda x: x["date"], reverse=True)
+    sorted_posts = newest_first(posts)
 
     posts_html = ""
     for post in sorted_posts:
@@ -675,67 +797,842 @@ def generate_article_html(post, prev_post=None, next_post=None):
     return generate_html_page(post["title"], body, page_type="article")
 
 
-def build_site():
-    """Main function to build the static site."""
-    import shutil
-    
+# Suffixes of the precompressed variants written next to each output file
+ENCODING_SUFFIXES = {"gzip": ".gz", "br": ".br"}
+
+
+def write_output(path, data, variants=None):
+    """Write an output file together with its precompressed variants."""
+    path.write_bytes(data)
+    if variants is None:
+        variants = compress_variants(data)
+    for encoding, compressed in variants.items():
+        path.with_name(path.name + ENCODING_SUFFIXES[encoding]).write_bytes(compressed)
+
+
+def remove_output(path):
+    """Remove an output file and its precompressed variants."""
+    for suffix in ("", *ENCODING_SUFFIXES.values()):
+        variant = path.with_name(path.name + suffix)
+        if variant.exists():
+            variant.unlink()
+
+
+# Identifies the renderer that produced a build: the compiled page shells
+# (theme, footer year), Markdown, embed, chart and image settings (including
+# whether Pillow is available) and output encodings.
+# A manifest written by another renderer version is ignored.
+RENDERER_VERSION = fingerprint(
+    b"".join(part for shell in PAGE_SHELLS.values() for part in shell)
+    + repr(
+        (
+            RENDERER_REVISION,
+            markdown.__version__,
+            CHART_EMBED_MODE,
+            ENCODINGS,
+            CHART_FLOAT_PRECISION,
+            CHART_TYPED_ARRAYS,
+            IMAGE_WIDTHS if Image is not None else None,
+            WEBP_QUALITY,
+        )
+    ).encode("utf-8")
+)
+
+
+def chart_embeds(html_content):
+    """Turn chart iframes into lazily loaded embeds."""
+    return lazy_chart_embeds(
+        html_content, "static/", CHART_EMBED_MODE, COLORS["gold"], COLORS["bg_card"]
+    )
+
+
+section_renderer = SectionRenderer(
+    postprocess=chart_embeds,
+    store=RenderCache(SECTION_CACHE_PATH, RENDERER_VERSION) if SECTION_CACHE_PATH else None,
+)
+
+
+def dependency_key(*parts):
+    """Hash the inputs of one output page."""
+    return fingerprint(json.dumps(parts, ensure_ascii=False).encode("utf-8"), 16)
+
+
+def load_manifest(output_dir):
+    """Return the previous build's manifest, or an empty one if it is missing or stale."""
+    empty = {
+        "renderer": RENDERER_VERSION,
+        "posts": {},
+        "pages": {},
+        "outputs": {},
+        "assets": {},
+        "links": {},
+    }
+    try:
+        manifest = json.loads((output_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return empty
+    if manifest.get("renderer") != RENDERER_VERSION:
+        return empty
+    return manifest
+
+
+def save_manifest(output_dir, manifest):
+    """Write the manifest atomically."""
+    path = output_dir / MANIFEST_NAME
+    temp = path.with_name(path.name + ".tmp")
+    temp.write_text(json.dumps(manifest, indent=1, sort_keys=True), encoding="utf-8")
+    os.replace(temp, path)
+
+
+class IncrementalWriter:
+    """
+    Writes pages whose dependencies or bytes changed since the last build.
+
+    ``previous`` is the last build's manifest. A page is skipped when its
+    dependency key is unchanged and its file still exists; a re-rendered
+    page is not written (nor recompressed) when its bytes are unchanged.
+    Changed pages are queued by ``add`` and written, in order, by ``flush``.
+    """
+
+    def __init__(self, output_dir, previous):
+        self.output_dir = output_dir
+        self.previous = previous
+        self.pages = {}
+        self.outputs = {}
+        self.written = []
+        self.unchanged = 0
+        self._pending = []
+
+    def is_current(self, name, key):
+        """True (and the page is kept) if the page's dependencies are unchanged."""
+        if self.previous["pages"].get(name) != key or name not in self.previous["outputs"]:
+            return False
+        if not (self.output_dir / name).exists():
+            return False
+        self.pages[name] = key
+        self.outputs[name] = self.previous["outputs"][name]
+        self.unchanged += 1
+        return True
+
+    def add(self, name, data, key=None):
+        """Record a rendered page and queue it for writing if its bytes changed."""
+        digest = fingerprint(data, 16)
+        if key is not None:
+            self.pages[name] = key
+        self.outputs[name] = digest
+        if self.previous["outputs"].get(name) == digest and (self.output_dir / name).exists():
+            self.unchanged += 1
+        else:
+            self._pending.append((name, data))
+
+    def add_file(self, name, digest, load):
+        """
+        Record a fingerprinted asset and write it unless the last build already did.
+
+        ``load()`` returns the asset's bytes; it is only called when they must be written.
+        """
+        if name in self.outputs:
+            return
+        self.outputs[name] = digest
+        path = self.output_dir / name
+        if self.previous["outputs"].get(name) == digest and path.exists():
+            self.unchanged += 1
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(load())
+        self.written.append(name)
+
+    def flush(self, run=None, profile=None):
+        """
+        Compress the queued pages (through ``run``, a map function) and write them.
+
+        Time is recorded in ``profile``'s "compress" and "write" stages.
+        """
+        if profile is None:
+            profile = BuildProfile()
+        pending, self._pending = self._pending, []
+        with profile.stage("compress"):
+            all_variants = list((run or map)(compress_variants, [data for _, data in pending]))
+        with profile.stage("write"):
+            for (name, data), variants in zip(pending, all_variants):
+                write_output(self.output_dir / name, data, variants)
+                self.written.append(name)
+
+    def remove_stale(self):
+        """Remove outputs of the last build that this build did not produce."""
+        removed = [name for name in self.previous["outputs"] if name not in self.outputs]
+        for name in removed:
+            remove_output(self.output_dir / name)
+        return removed
+
+
+class AssetLinker:
+    """
+    Maps the local assets that article HTML references to fingerprinted outputs.
+
+    References are attribute or ``url()`` values starting with ``static/``
+    or ``content/`` (optionally with a leading ``/``), including the
+    ``&quot;``-quoted ones inside chart placeholders; text inside ``<pre>``
+    and ``<code>`` is not a reference. A file is emitted as
+    ``static/<dir>/<name>.<hash>.<ext>``, keeping its directory below
+    ``static/`` or ``content/``. Files with the same bytes (and extension)
+    share one output, named after the first of them that is linked.
+    Charts with an inlined plotly.js are emitted without it and load the
+    shared ``static/plotly-<version>.min.<hash>.js`` instead, and their
+    figure data is compacted (see blog_charts).
+
+    PNG and JPEG images get explicit dimensions and, with Pillow, resized
+    WebP variants in a ``srcset`` (see blog_images).
+
+    ``previous`` is the last build's ``{source: {"stamp", "digest", "scripts",
+    "image"}}``; files whose (mtime, size) are unchanged are not read again.
+    """
+
+    REFERENCE_RE = re.compile(r"(?<=[\"'(;=])/?((static|content)/[^\"'()\s?#&<>]+)")
+    CODE_RE = re.compile(r"(<(pre|code)\b.*?</\2\s*>)", re.I | re.S)
+
+    def __init__(self, previous):
+        self.previous = previous
+        self.assets = {}
+        self.roots = {"static": STATIC_DIR, "content": CONTENT_DIR}
+        self.extractor = PlotlyExtractor()
+        self.images = ImageVariants(IMAGE_CACHE_DIR)
+        self._data = {}
+        self._sources = {}
+        # (digest, extension) -> the source whose name an output takes
+        self._canonical = {}
+
+    def source(self, reference):
+        """Return the source path (``static/x.html``) a reference points to, or None."""
+        root, _, rel = reference.partition("/")
+        path = self.roots[root] / rel
+        if ".." in Path(rel).parts or path.suffix == ".md" or not path.is_file():
+            return None
+        return path.as_posix()
+
+    def relative(self, source):
+        """Return a source's path below its root (``charts/gdp.html``)."""
+        path = Path(source)
+        for root in self.roots.values():
+            try:
+                return path.relative_to(root).as_posix()
+            except ValueError:
+                continue
+        return path.name
+
+    def asset(self, source):
+        """Return the manifest entry of a source file (None if it is gone), cached by stamp."""
+        if source not in self.assets:
+            try:
+                stat = os.stat(source)
+            except OSError:
+                return None
+            stamp = [stat.st_mtime_ns, stat.st_size]
+            known = self.previous.get(source)
+            if known is not None and known["stamp"] == stamp:
+                self.assets[source] = known
+            else:
+                self.assets[source] = self._process(source, stamp)
+        return self.assets[source]
+
+    def _process(self, source, stamp):
+        data = Path(source).read_bytes()
+        scripts = {}
+        if source.endswith(".html"):
+            # The shared script sits at the top of the output directory
+            data, script = self.extractor.process(data, self.relative(source).count("/"))
+            if script is not None:
+                scripts[script] = fingerprint(self.extractor.scripts[script])
+            compacted = compact_chart(data, CHART_FLOAT_PRECISION, CHART_TYPED_ARRAYS)
+            if compacted != data and source not in self._data:
+                print(
+                    f"  Compacted: {source} ({len(data):,} -> {len(compacted):,} bytes, "
+                    f"{(len(compacted) - len(data)) / len(data):+.1%})"
+                )
+            data = compacted
+        image = image_size(data) if source.lower().endswith(RASTER_SUFFIXES) else None
+        self._data[source] = data
+        return {"stamp": stamp, "digest": fingerprint(data), "scripts": scripts, "image": image}
+
+    def canonical(self, source):
+        """Return the source whose output a source file shares (the first linked with its bytes)."""
+        key = (self.asset(source)["digest"], Path(source).suffix.lower())
+        return self._canonical.setdefault(key, source)
+
+    def output(self, source):
+        """Return the fingerprinted output name of a source file, or None."""
+        asset = self.asset(source)
+        if asset is None:
+            return None
+        head, _, name = self.relative(self.canonical(source)).rpartition("/")
+        directory = f"{ASSET_OUTPUT_DIR}/{head}/" if head else f"{ASSET_OUTPUT_DIR}/"
+        return directory + hashed_name(name, asset["digest"])
+
+    def data(self, source):
+        """Return the bytes to write for a source file."""
+        if source not in self._data:
+            self._process(source, self.assets[source]["stamp"])
+        return self._data.pop(source)
+
+    def script(self, name, source):
+        """Return the bytes of a shared script extracted from a source file."""
+        if name not in self.extractor.scripts:
+            self._process(source, self.assets[source]["stamp"])
+            self._data.pop(source)
+        return self.extractor.scripts[name]
+
+    def image_variants(self, source):
+        """Return [(output name, width), ...] for the WebP variants of an image."""
+        asset = self.assets[source]
+        if not asset["image"]:
+            return []
+        directory = self.output(source).rpartition("/")[0]
+        name = Path(self.canonical(source)).name
+        return [
+            (f"{directory}/{variant_name(name, asset['digest'], width)}", width)
+            for width in self.images.widths_for(asset["image"][0])
+        ]
+
+    def image(self, src):
+        """Return (width, height, variants) for a linked image output, for responsive_images()."""
+        source = self._sources.get(src)
+        if source is None or not self.assets[source]["image"]:
+            return None
+        width, height = self.assets[source]["image"]
+        return width, height, self.image_variants(source)
+
+    def add_outputs(self, writer, sources):
+        """Record the outputs of the given source files, and their derived files, with a writer."""
+        for source in sources:
+            asset = self.asset(source)
+            canonical = self.canonical(source)
+            if canonical != source:
+                # A copy of another source: its output is written from that one
+                self._data.pop(source, None)
+            writer.add_file(self.output(source), asset["digest"], partial(self.data, canonical))
+            for name, digest in asset["scripts"].items():
+                writer.add_file(
+                    f"{ASSET_OUTPUT_DIR}/{name}", digest, partial(self.script, name, source)
+                )
+            for name, width in self.image_variants(source):
+                writer.add_file(
+                    name,
+                    f"{asset['digest']}-{width}",
+                    partial(self.images.get, source, asset["digest"], width),
+                )
+
+    def link(self, html):
+        """Return (html with references rewritten, sorted sources, missing references)."""
+        sources = set()
+        missing = set()
+
+        def rewrite(match):
+            source = self.source(match.group(1))
+            output = self.output(source) if source else None
+            if output is None:
+                missing.add(match.group(1))
+                return match.group()
+            sources.add(source)
+            self._sources[output] = source
+            return output
+
+        parts = self.CODE_RE.split(html)
+        # split() yields text, code block, tag name, text, ...
+        for i in range(0, len(parts), 3):
+            parts[i] = responsive_images(self.REFERENCE_RE.sub(rewrite, parts[i]), self.image)
+            if i + 2 < len(parts):
+                parts[i + 2] = ""
+        return "".join(parts), sorted(sources), sorted(missing)
+
+
+def load_posts(md_files, verbose=True):
+    """Parse Markdown files and return the posts sorted by date (newest first)."""
+    posts = []
+    for md_file in md_files:
+        if verbose:
+            print(f"  Processing: {md_file.name}")
+        posts.append(parse_markdown_file(md_file))
+    return newest_first(posts)
+
+
+def render_pages(posts):
+    """
+    Render the index and every article page for posts sorted newest first.
+
+    Returns a dict mapping output file names to page bytes, in output order.
+    """
+    pages = {"index.html": generate_index_html(posts)}
+    for i, post in enumerate(posts):
+        prev_post = posts[i + 1] if i + 1 < len(posts) else None
+        next_post = posts[i - 1] if i > 0 else None
+        pages[f"{post['slug']}.html"] = generate_article_html(post, prev_post, next_post)
+    return pages
+
+
+def peak_memory_mb(who="self"):
+    """Return the peak resident memory of this process ("self") or its workers ("children") in MB."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(
+        resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN
+    )
+    # ru_maxrss is in kilobytes, except on macOS where it is in bytes
+    scale = 1 << 20 if sys.platform == "darwin" else 1 << 10
+    return round(usage.ru_maxrss / scale, 1)
+
+
+class BuildProfile:
+    """
+    Seconds spent in each stage of a build, for --profile.
+
+    "parse" and "markdown" are summed over the parsed posts, so with
+    --jobs they are CPU time across workers rather than wall-clock time.
+    The other stages are wall-clock time in the main process.
+    """
+
+    STAGES = ("discover", "parse", "markdown", "index", "assets", "articles", "compress", "write")
+
+    def __init__(self):
+        self.seconds = dict.fromkeys(self.STAGES, 0.0)
+        self.started = time.perf_counter()
+        self.total = None
+        self.counts = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - started
+
+    def add(self, timings):
+        """Add a {stage: seconds} dict (from parse_markdown_file())."""
+        for name, seconds in timings.items():
+            self.seconds[name] += seconds
+
+    def finish(self, **counts):
+        """Stop the clock and record counts (posts, pages written, ...)."""
+        self.total = time.perf_counter() - self.started
+        self.counts = counts
+
+    def report(self):
+        """Return the profile as a JSON-serialisable dict."""
+        return {
+            "stages": {name: round(seconds, 4) for name, seconds in self.seconds.items()},
+            "total_s": round(self.total, 4) if self.total is not None else None,
+            "peak_rss_mb": peak_memory_mb("self"),
+            "peak_worker_rss_mb": peak_memory_mb("children"),
+            **self.counts,
+        }
+
+    def print(self):
+        report = self.report()
+        total = report["total_s"] or 0.0
+        print("\nBuild profile:")
+        for name, seconds in report["stages"].items():
+            share = f"{seconds / total:6.1%}" if total else ""
+            print(f"  {name:<10} {seconds:9.3f} s {share}")
+        print(f"  {'total':<10} {total:9.3f} s")
+        if report["peak_rss_mb"] is not None:
+            workers = report["peak_worker_rss_mb"]
+            print(f"  peak memory {report['peak_rss_mb']} MB"
+                  + (f" (workers {workers} MB)" if workers else ""))
+
+
+def parse_markdown_timed(filepath):
+    """Return (post, timings) for a Markdown file; see parse_markdown_file()."""
+    timings = {}
+    return parse_markdown_file(filepath, timings), timings
+
+
+def parse_posts(paths, run, profile):
+    """Parse Markdown files through ``run``, adding their timings to ``profile``."""
+    parsed = []
+    for post, timings in run(parse_markdown_timed, paths):
+        profile.add(timings)
+        parsed.append(post)
+    return parsed
+
+
+def scan_posts(md_files, previous, run=map, profile=None):
+    """
+    Hash every source and return its post, sorted like load_posts().
+
+    Posts whose source hash matches the previous manifest are returned as
+    metadata only (no "content"/"toc"); the others are parsed in full
+    through ``run``, a map function. Time is recorded in ``profile``.
+    """
+    if profile is None:
+        profile = BuildProfile()
+    posts = []
+    changed = []
+    with profile.stage("discover"):
+        for md_file in md_files:
+            stat = md_file.stat()
+            stamp = [stat.st_mtime_ns, stat.st_size]
+            known = previous["posts"].get(md_file.stem)
+            # Only files whose (mtime, size) changed are read and hashed
+            if known is not None and known.get("stamp") == stamp:
+                source = known["source"]
+            else:
+                source = fingerprint(md_file.read_bytes(), 16)
+            if known is not None and known["source"] == source:
+                post = {key: known[key] for key in ("title", "date", "author")}
+                post["slug"] = md_file.stem
+            else:
+                print(f"  Processing: {md_file.name}")
+                post = {}
+                changed.append(post)
+            post["source"] = source
+            post["stamp"] = stamp
+            post["path"] = md_file
+            posts.append(post)
+
+    for post, parsed in zip(changed, parse_posts([post["path"] for post in changed], run, profile)):
+        post.update(parsed)
+    return newest_first(posts)
+
+
+def make_runner(jobs):
+    """
+    Return (run, pool): an ordered map function over ``jobs`` processes.
+
+    ``run(function, *iterables)`` returns a list, so work is done by the
+    time it returns. With one job it maps in this process and ``pool`` is
+    None.
+    """
+    if jobs <= 1:
+        return (lambda function, *iterables: list(map(function, *iterables))), None
+
+    pool = ProcessPoolExecutor(max_workers=jobs)
+
+    def run(function, *iterables):
+        items = [list(iterable) for iterable in iterables]
+        chunksize = max(1, len(items[0]) // (jobs * 4)) if items else 1
+        return list(pool.map(function, *items, chunksize=chunksize))
+
+    return run, pool
+
+
+def build_site(force=False, jobs=1):
+    """
+    Main function to build the static site (incrementally unless force is set).
+
+    With ``jobs`` > 1, Markdown conversion, article rendering and compression
+    run on a process pool; pages are still assembled and written in order,
+    so the output is byte-identical to a serial build.
+
+    Returns the build's BuildProfile.
+    """
+    profile = BuildProfile()
     print(f"Building {SITE_TITLE}...")
 
     # Create output directory
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
-    # Copy static files (favicon, logo) if they exist
+    # Copy static files (favicon, logo) if they exist and changed
     if STATIC_DIR.exists():
-        favicon_src = STATIC_DIR / "favicon.svg"
-        if favicon_src.exists():
-            shutil.copy(favicon_src, OUTPUT_DIR / "favicon.svg")
-            print("  Copied: favicon.svg")
-        
-        logo_src = STATIC_DIR / "logo.png"
-        if logo_src.exists():
-            shutil.copy(logo_src, OUTPUT_DIR / "logo.png")
-            print("  Copied: logo.png")
+        for name in ROOT_STATIC_FILES:
+            src = STATIC_DIR / name
+            dst = OUTPUT_DIR / name
+            if src.exists() and not (dst.exists() and filecmp.cmp(src, dst, shallow=False)):
+                shutil.copy(src, dst)
+                print(f"  Copied: {name}")
 
     # Find all markdown files
-    md_files = list(CONTENT_DIR.glob("*.md"))
+    with profile.stage("discover"):
+        md_files = sorted(CONTENT_DIR.glob("*.md"))
 
     if not md_files:
         print("No markdown files found in content/ directory.")
         print("Please add Markdown files to the content/ directory.")
         print("See BLOG_README.md for instructions on adding articles.")
-        return
+        profile.finish(posts=0, written=0, unchanged=0)
+        return profile
 
-    # Parse all posts
-    posts = []
-    for md_file in md_files:
-        print(f"  Processing: {md_file.name}")
-        post = parse_markdown_file(md_file)
-        posts.append(post)
+    with profile.stage("discover"):
+        previous = load_manifest(OUTPUT_DIR)
+    if force:
+        previous = {**previous, "posts": {}, "pages": {}}
+    writer = IncrementalWriter(OUTPUT_DIR, previous)
+    if section_renderer.store:
+        # Create the shared section store before any worker opens it
+        section_renderer.store.open()
+    run, pool = make_runner(jobs)
+    try:
+        # Write the fingerprinted stylesheet and drop ones from earlier builds
+        for stale_css in OUTPUT_DIR.glob("theme.*.css*"):
+            if not stale_css.name.startswith(THEME_CSS_NAME):
+                stale_css.unlink()
+        writer.add(THEME_CSS_NAME, THEME_CSS)
 
-    # Sort posts by date
-    posts = sorted(posts, key=lambda x: x["date"], reverse=True)
+        # Hash all sources and parse the changed ones, sorted by date
+        posts = scan_posts(md_files, previous, run, profile)
 
-    # Generate index page
-    index_html = generate_index_html(posts)
-    index_path = OUTPUT_DIR / "index.html"
-    with open(index_path, "w", encoding="utf-8") as f:
-        f.write(index_html)
-    print(f"  Generated: index.html")
+        # The index depends on every post's listing fields and their order
+        index_key = dependency_key(
+            [[post[field] for field in ("slug", "title", "date", "author")] for post in posts]
+        )
+        if not writer.is_current("index.html", index_key):
+            with profile.stage("index"):
+                html = generate_index_html(posts)
+            writer.add("index.html", html, index_key)
 
-    # Generate individual article pages
-    for i, post in enumerate(posts):
-        prev_post = posts[i + 1] if i + 1 < len(posts) else None
-        next_post = posts[i - 1] if i > 0 else None
+        # An article depends on its source, its neighbours' links and the
+        # fingerprinted names of the assets it references
+        assets = AssetLinker(previous["assets"])
+        links = {}
+        stale = []
+        for i, post in enumerate(posts):
+            prev_post = posts[i + 1] if i + 1 < len(posts) else None
+            next_post = posts[i - 1] if i > 0 else None
+            name = f"{post['slug']}.html"
+            neighbours = [[p["slug"], p["title"]] if p else None for p in (prev_post, next_post)]
+            sources = previous["links"].get(name)
+            if "content" not in post and sources is not None:
+                outputs = [assets.output(source) for source in sources]
+                if writer.is_current(name, dependency_key(post["source"], neighbours, outputs)):
+                    links[name] = sources
+                    continue
+            stale.append((name, neighbours, post, prev_post, next_post))
+
+        # Unchanged posts whose pages must be re-rendered (a neighbour or asset changed)
+        unparsed = [post for _, _, post, _, _ in stale if "content" not in post]
+        for post, parsed in zip(unparsed, parse_posts([p["path"] for p in unparsed], run, profile)):
+            post.update(parsed)
+
+        keys = []
+        with profile.stage("assets"):
+            for name, neighbours, post, _, _ in stale:
+                post["content"], links[name], missing = assets.link(post["content"])
+                for reference in missing:
+                    print(f"  Missing asset: {reference} (in {name})")
+                outputs = [assets.output(source) for source in links[name]]
+                keys.append(dependency_key(post["source"], neighbours, outputs))
+
+            # Write each referenced asset once, under its fingerprinted name
+            for sources in links.values():
+                assets.add_outputs(writer, sources)
+
+        with profile.stage("articles"):
+            pages = run(
+                generate_article_html,
+                [post for _, _, post, _, _ in stale],
+                [prev_post for _, _, _, prev_post, _ in stale],
+                [next_post for _, _, _, _, next_post in stale],
+            )
+        for (name, _, _, _, _), key, html in zip(stale, keys, pages):
+            writer.add(name, html, key)
+        writer.flush(run, profile)
+    finally:
+        if pool is not None:
+            pool.shutdown()
 
-        article_html = generate_article_html(post, prev_post, next_post)
-        article_path = OUTPUT_DIR / f"{post['slug']}.html"
-        with open(article_path, "w", encoding="utf-8") as f:
-            f.write(article_html)
-        print(f"  Generated: {post['slug']}.html")
+    for name in writer.written:
+        print(f"  Generated: {name}")
+    with profile.stage("write"):
+        removed = writer.remove_stale()
+        save_manifest(
+            OUTPUT_DIR,
+            {
+                "renderer": RENDERER_VERSION,
+                "posts": {
+                    post["slug"]: {
+                        key: post[key] for key in ("source", "stamp", "title", "date", "author")
+                    }
+                    for post in posts
+                },
+                "pages": writer.pages,
+                "outputs": writer.outputs,
+                "assets": assets.assets,
+                "links": links,
+            },
+        )
+    for name in removed:
+        print(f"  Removed: {name}")
 
     print(f"\nBuild complete! Site generated in '{OUTPUT_DIR}/' directory.")
-    print(f"Total articles: {len(posts)}")
+    print(f"Total articles: {len(posts)} ({len(writer.written)} files written, "
+          f"{writer.unchanged} unchanged)")
+    profile.finish(posts=len(posts), written=len(writer.written), unchanged=writer.unchanged)
+    return profile
+
+
+class LiveReload:
+    """Build counter that preview connections wait on to learn of a rebuild."""
+
+    def __init__(self):
+        self.build = 0
+        self._changed = threading.Condition()
+
+    def notify(self):
+        with self._changed:
+            self.build += 1
+            self._changed.notify_all()
+
+    def wait(self, build, timeout):
+        """Wait until a build newer than ``build`` finishes; return the latest build."""
+        with self._changed:
+            self._changed.wait_for(lambda: self.build != build, timeout)
+            return self.build
+
+
+LIVE_RELOAD_PATH = "/__livereload"
+LIVE_RELOAD_SCRIPT = (
+    f'<script>new EventSource("{LIVE_RELOAD_PATH}").onmessage=function(){{location.reload()}}'
+    "</script>"
+).encode("utf-8")
+
+
+class PreviewHandler(SimpleHTTPRequestHandler):
+    """
+    Serves OUTPUT_DIR for --watch, with a live-reload channel.
+
+    HTML pages get a small script that listens on a server-sent events
+    stream (``LIVE_RELOAD_PATH``) and reloads the page after each rebuild.
+    The script is only injected in responses, never written to the site.
+    """
+
+    live_reload = None
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == LIVE_RELOAD_PATH:
+            self.stream_reloads()
+            return
+        if path.endswith("/"):
+            path += "index.html"
+        if not path.endswith(".html"):
+            super().do_GET()
+            return
+
+        file_path = Path(self.translate_path(path))
+        try:
+            html = file_path.read_bytes()
+        except OSError:
+            self.send_error(404, "File not found")
+            return
+        head, body_end, tail = html.rpartition(b"</body>")
+        html = head + LIVE_RELOAD_SCRIPT + body_end + tail if body_end else html + LIVE_RELOAD_SCRIPT
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(html)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(html)
+
+    def stream_reloads(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        build = self.live_reload.build
+        try:
+            while True:
+                latest = self.live_reload.wait(build, timeout=15)
+                # A comment line keeps idle connections open
+                self.wfile.write(b"data: reload\n\n" if latest != build else b": ping\n\n")
+                self.wfile.flush()
+                build = latest
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def source_snapshot():
+    """Return {path: (mtime, size)} for every file under CONTENT_DIR and STATIC_DIR."""
+    snapshot = {}
+    for directory in (CONTENT_DIR, STATIC_DIR):
+        if not directory.exists():
+            continue
+        for dirpath, _, filenames in os.walk(directory):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+def watch(port=PREVIEW_PORT, jobs=1):
+    """Build, serve OUTPUT_DIR with live reload and rebuild whenever a source changes."""
+    build_site(jobs=jobs)
+    live_reload = LiveReload()
+    handler = type("Handler", (PreviewHandler,), {"live_reload": live_reload})
+    server = ThreadingHTTPServer(("127.0.0.1", port), partial(handler, directory=str(OUTPUT_DIR)))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"\nServing {OUTPUT_DIR}/ at http://127.0.0.1:{port}/ with live reload")
+    print(f"Watching {CONTENT_DIR}/ and {STATIC_DIR}/ for changes (Ctrl+C to stop)")
+
+    snapshot = source_snapshot()
+    try:
+        while True:
+            time.sleep(WATCH_INTERVAL)
+            current = source_snapshot()
+            if current == snapshot:
+                continue
+            changed = sorted(
+                path for path in current.keys() | snapshot.keys()
+                if current.get(path) != snapshot.get(path)
+            )
+            snapshot = current
+            print(f"\nChanged: {', '.join(changed)}")
+            started = time.perf_counter()
+            try:
+                build_site(jobs=jobs)
+            except Exception:
+                traceback.print_exc()
+                continue
+            print(f"Rebuilt in {(time.perf_counter() - started) * 1000:.0f} ms")
+            live_reload.notify()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=f"Build the {SITE_TITLE} static site.")
+    parser.add_argument(
+        "--force", action="store_true", help="ignore the manifest and re-render every page"
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1,
+        help="worker processes for parsing, rendering and compression (0 = one per CPU)",
+    )
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="rebuild on changes and serve the site with live reload",
+    )
+    parser.add_argument("--port", type=int, default=PREVIEW_PORT, help="preview port for --watch")
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="print per-stage timings and peak memory after the build",
+    )
+    parser.add_argument(
+        "--profile-json", type=Path, metavar="FILE",
+        help="write the build profile to FILE as JSON (see benchmarks/bench_build.py)",
+    )
+    args = parser.parse_args()
+    jobs = args.jobs or os.cpu_count() or 1
+    if args.watch:
+        if args.force:
+            build_site(force=True, jobs=jobs)
+        watch(args.port, jobs)
+    else:
+        profile = build_site(force=args.force, jobs=jobs)
+        if args.profile:
+            profile.print()
+        if args.profile_json:
+            report = {**profile.report(), "jobs": jobs, "force": args.force}
+            args.profile_json.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
 
 
 if __name__ == "__main__":
-    build_site()
+    main()
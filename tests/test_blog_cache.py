@@ -0,0 +1,94 @@
+import multiprocessing
+import sqlite3
+import time
+
+import blog_cache
+from blog_cache import RenderCache
+
+WORKERS = 8
+
+
+def open_and_write(path, start, results):
+    time.sleep(max(0.0, start - time.time()))
+    cache = RenderCache(path, "v1")
+    digest = f"source-{multiprocessing.current_process().name}"
+    cache.put(digest, ("<p>content</p>", "<ul></ul>"))
+    results.put((cache.get(digest), cache.disabled))
+
+
+def test_processes_opening_a_new_database_together(tmp_path):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    path = tmp_path / "cache.sqlite3"
+    start = time.time() + 1
+    workers = [
+        context.Process(target=open_and_write, args=(path, start, results)) for _ in range(WORKERS)
+    ]
+    for worker in workers:
+        worker.start()
+    outcomes = [results.get(timeout=60) for _ in workers]
+    for worker in workers:
+        worker.join()
+    assert outcomes == [(("<p>content</p>", "<ul></ul>"), False)] * WORKERS
+    assert sqlite3.connect(path).execute("PRAGMA journal_mode").fetchone() == ("wal",)
+
+
+class LockedConnection:
+    """A connection whose first ``locked`` switches to WAL fail as if another process held the lock."""
+
+    def __init__(self, connection, locked):
+        self.connection = connection
+        self.locked = locked
+
+    def execute(self, sql, *args):
+        if sql == "PRAGMA journal_mode=WAL" and self.locked:
+            self.locked -= 1
+            raise sqlite3.OperationalError("database is locked")
+        return self.connection.execute(sql, *args)
+
+    def close(self):
+        self.connection.close()
+
+
+def test_switching_to_wal_is_retried(tmp_path, monkeypatch):
+    connect = sqlite3.connect
+    monkeypatch.setattr(
+        blog_cache.sqlite3, "connect", lambda *args, **kwargs: LockedConnection(connect(*args, **kwargs), 3)
+    )
+    cache = RenderCache(tmp_path / "cache.sqlite3", "v1")
+    cache.put("source", ("<p>content</p>", ""))
+    assert cache.get("source") == ("<p>content</p>", "")
+    assert not cache.disabled
+
+
+def test_unopenable_database_disables_the_cache(tmp_path, monkeypatch):
+    connects = []
+    connect = sqlite3.connect
+
+    def counting_connect(*args, **kwargs):
+        connects.append(args[0])
+        return connect(*args, **kwargs)
+
+    monkeypatch.setattr(blog_cache.sqlite3, "connect", counting_connect)
+    # A directory cannot be opened as a database
+    cache = RenderCache(tmp_path, "v1")
+    assert cache.get("source") is None
+    cache.put("source", ("<p>content</p>", ""))
+    assert cache.get("source") is None
+    assert cache.disabled
+    assert len(connects) == 1
+
+
+def test_round_trip(tmp_path):
+    cache = RenderCache(tmp_path / "cache.sqlite3", "v1")
+    assert cache.get("source") is None
+    cache.put("source", ("<p>content</p>", "<ul></ul>"))
+    assert cache.get("source") == ("<p>content</p>", "<ul></ul>")
+    # Another renderer version never reads these bodies
+    assert RenderCache(tmp_path / "cache.sqlite3", "v2").get("source") is None
+
+
+def test_open_creates_the_database(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    RenderCache(path, "v1").open()
+    assert sqlite3.connect(path).execute("PRAGMA journal_mode").fetchone() == ("wal",)
@@ -0,0 +1,68 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from blog_charts import compact_chart
+
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+SCRIPT = b'<script charset="utf-8" src="plotly-2.35.2.min.js"></script>'
+
+
+def chart(arguments):
+    return (
+        b"<html><body>" + SCRIPT + b'<div id="chart"></div><script>Plotly.newPlot("chart", '
+        + arguments.encode("utf-8") + b")</script></body></html>"
+    )
+
+
+def figure_arguments(html):
+    start = html.index(b'Plotly.newPlot("chart", ') + len(b'Plotly.newPlot("chart", ')
+    return html[start:html.index(b")</script>", start)].decode("utf-8")
+
+
+def traces_of(html):
+    return json.JSONDecoder().raw_decode(figure_arguments(html))[0]
+
+
+def test_chart_without_layout():
+    data = chart(json.dumps([{"x": list(range(100)), "y": [4, 5, 6]}]))
+    compacted = compact_chart(data)
+    traces = traces_of(compacted)
+    assert traces[0]["x"]["dtype"] == "i1"
+    # Arrays whose typed form is longer stay JSON
+    assert traces[0]["y"] == [4, 5, 6]
+    assert compact_chart(compacted) == compacted
+
+
+def test_chart_with_layout_and_config():
+    data = chart('[{"y": [0.5, null, 1.5], "type": "bar"}], {"title": {"text": "A"}}, {"responsive": true}')
+    compacted = compact_chart(data)
+    arguments = figure_arguments(compacted)
+    # Gaps keep the array as JSON; the layout is re-serialised, the config kept
+    assert arguments == '[{"y":[0.5,null,1.5],"type":"bar"}], {"title":{"text":"A"}}, {"responsive": true}'
+    assert compact_chart(compacted) == compacted
+
+
+def test_typed_arrays_need_plotly_2_28():
+    data = chart(json.dumps([{"x": list(range(100))}])).replace(b"plotly-2.35.2", b"plotly-2.27.0")
+    assert traces_of(compact_chart(data))[0]["x"] == list(range(100))
+
+
+def test_precision_rounds_floats():
+    data = chart('[{"y": [0.123456, 1.98765]}], {}')
+    traces = traces_of(compact_chart(data, precision=3, binary=False))
+    assert traces[0]["y"] == [0.123, 1.99]
+
+
+def test_file_without_figure_is_unchanged():
+    data = b"<html><body><table><tr><td>1</td></tr></table></body></html>"
+    assert compact_chart(data) is data
+
+
+@pytest.mark.parametrize(
+    "path", sorted(STATIC_DIR.rglob("*.html")), ids=lambda path: path.name
+)
+def test_static_charts_are_idempotent(path):
+    compacted = compact_chart(path.read_bytes())
+    assert compact_chart(compacted) == compacted
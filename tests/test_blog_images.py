@@ -0,0 +1,51 @@
+import struct
+import zlib
+
+import pytest
+
+from blog_assets import AssetManifest
+from blog_images import ImageVariants, ResponsiveImages, image_size, variant_name
+
+
+def png(width, height):
+    """A minimal grey PNG of the given size."""
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    rows = b"".join(b"\x00" + b"\x80" * width for _ in range(height))
+    header = struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(rows))
+        + chunk(b"IEND", b"")
+    )
+
+
+def test_image_size():
+    assert image_size(png(700, 300)) == (700, 300)
+    assert image_size(b"GIF89a" + struct.pack("<HH", 12, 34)) == (12, 34)
+    assert image_size(b"not an image") is None
+
+
+def test_webp_variants(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    static = tmp_path / "static"
+    static.mkdir()
+    (static / "chart.png").write_bytes(png(700, 300))
+    manifest = AssetManifest(static).scan()
+    images = ResponsiveImages(manifest, ImageVariants(tmp_path / "cache")).scan()
+
+    width, height, variants = images.lookup("/static/chart.png")
+    digest = manifest.digest("chart.png")
+    assert (width, height) == (700, 300)
+    assert variants == [
+        (f"/static/{variant_name('chart.png', digest, size)}", size) for size in (320, 640, 700)
+    ]
+
+    data = images.get(variant_name("chart.png", digest, 320))
+    assert data[:4] == b"RIFF" and data[8:12] == b"WEBP"
+    with Image.open(static.parent / "cache" / f"{digest}-320w-q80.webp") as variant:
+        assert variant.size == (320, 137)
+    assert images.get("chart.png") is None
@@ -0,0 +1,70 @@
+import contextlib
+
+import markdown
+import pytest
+
+from blog_markdown import SECTION_MIN_SIZE, SectionRenderer, split_sections
+
+PARAGRAPH = "Yields rose as the market priced in further rate rises. " * 6
+
+
+def section(heading, *blocks):
+    filler = "\n\n".join([PARAGRAPH] * (SECTION_MIN_SIZE // len(PARAGRAPH) + 1))
+    return "\n\n".join([heading, *blocks, filler])
+
+
+DOCUMENTS = {
+    "duplicate headings": "\n\n".join(
+        [
+            "Intro paragraph.",
+            section("## Overview", "### Details"),
+            section("## Overview", "### Details"),
+            section("## Overview", "### Details"),
+            section("Overview\n--------", "### Details"),
+        ]
+    ),
+    "fenced code with # lines": "\n\n".join(
+        [
+            section("## Setup"),
+            section(
+                "## Script",
+                "```python\n# Overview\nprint(1)\n\n## Setup\n```",
+                "~~~\n# not a heading\n~~~",
+            ),
+            section("## Setup", "Indented:\n\n    # still code"),
+        ]
+    ),
+}
+
+
+def whole_document(source):
+    md = markdown.Markdown(extensions=["extra", "toc"])
+    return md.convert(source), md.toc
+
+
+@pytest.mark.parametrize("name", DOCUMENTS)
+def test_sections_stitch_like_a_whole_document(name):
+    source = DOCUMENTS[name]
+    assert len(split_sections(source)) > 2
+    assert SectionRenderer().render(source) == whole_document(source)
+
+
+def test_cached_sections_stitch_the_same():
+    renderer = SectionRenderer()
+    source = DOCUMENTS["duplicate headings"]
+    first = renderer.render(source)
+    # The repeated sections are converted once and renamed on reuse
+    assert len(renderer) < len(split_sections(source))
+    assert renderer.render(source) == first == whole_document(source)
+    assert 'id="overview_1"' in first[0] and 'href="#details_2"' in first[1]
+
+
+def test_toc_generation_is_timed():
+    phases = []
+
+    def timed(phase):
+        phases.append(phase)
+        return contextlib.nullcontext()
+
+    SectionRenderer(timed=timed).render(DOCUMENTS["duplicate headings"])
+    assert phases == ["toc"]
@@ -0,0 +1,51 @@
+import pytest
+
+import blog_search
+from blog_search import SearchIndex
+
+WORDS = "market inflation yield bond equity growth labor wage".split()
+
+
+@pytest.fixture
+def index():
+    """An index of 60 posts; post-N repeats "market" N times."""
+    sources = {}
+    for number in range(60):
+        words = [WORDS[(number + offset) % len(WORDS)] for offset in range(40)]
+        sources[f"post-{number}"] = " ".join(words + ["market"] * number)
+    index = SearchIndex(sources.__getitem__)
+    for slug in sources:
+        index.update({"slug": slug, "title": slug, "author": "Tester", "date": "2024-01-01"})
+    return index
+
+
+def slugs(results):
+    return [result["slug"] for result in results]
+
+
+def test_single_term_ranking_is_unchanged_by_the_candidate_cap(index, monkeypatch):
+    full, total, exact = index.search("market", limit=5)
+    monkeypatch.setattr(blog_search, "SCORED_CANDIDATES", 10)
+    capped, capped_total, capped_exact = index.search("market", limit=5)
+    assert slugs(capped) == slugs(full) == [f"post-{number}" for number in range(59, 54, -1)]
+    assert (capped_total, capped_exact) == (total, exact) == (60, True)
+
+
+def test_capped_results_all_match(index, monkeypatch):
+    monkeypatch.setattr(blog_search, "SCORED_CANDIDATES", 10)
+    results, total, _ = index.search("market labor", limit=20)
+    assert total == 60
+    assert len(results) == 10
+    assert all("<mark>" in result["snippet"] for result in results)
+
+
+def test_phrase_total_is_estimated_past_phrase_checks(index, monkeypatch):
+    monkeypatch.setattr(blog_search, "PHRASE_CHECKS", 5)
+    results, total, exact = index.search('"market market"', limit=3)
+    assert len(results) == 3
+    assert not exact
+    assert total > 0
+
+
+def test_missing_term_matches_nothing(index):
+    assert index.search("market zebra") == ([], 0, True)
@@ -0,0 +1,301 @@
+import asyncio
+import os
+import threading
+import time
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+
+# Keep the tests' rendered bodies out of the shared SQLite render cache
+os.environ["BLOG_RENDER_CACHE"] = ""
+
+import blog_server  # noqa: E402
+import build_site  # noqa: E402
+from blog_assets import AssetManifest, fingerprint, file_fingerprint, hashed_name  # noqa: E402
+from blog_charts import ChartAssets  # noqa: E402
+from blog_markdown import SectionRenderer  # noqa: E402
+
+POST = """# Post {number}
+date: 2024-01-{number:02d}
+author: Tester
+
+Intro paragraph.
+
+## Section
+
+Body of post {number}.
+"""
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """Point blog_server at a small corpus with empty caches and no streaming."""
+    for number in range(1, 4):
+        (tmp_path / f"post-{number}.md").write_text(POST.format(number=number), encoding="utf-8")
+    post_cache = blog_server.PostCache(tmp_path)
+    page_cache = blog_server.PageCache()
+    post_cache.add_listener(page_cache.discard)
+    monkeypatch.setattr(blog_server, "CONTENT_DIR", tmp_path)
+    monkeypatch.setattr(blog_server, "post_cache", post_cache)
+    monkeypatch.setattr(blog_server, "post_bodies", blog_server.PostBodyCache())
+    monkeypatch.setattr(blog_server, "page_cache", page_cache)
+    monkeypatch.setattr(blog_server, "prebuilt_site", blog_server.PrebuiltSite())
+    monkeypatch.setattr(blog_server, "_inflight_renders", {})
+    monkeypatch.setattr(blog_server, "STREAM_ARTICLES", False)
+    post_cache.refresh(True)
+    return blog_server
+
+
+def client():
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=blog_server.app),
+        base_url="http://test",
+        headers={"Accept-Encoding": "identity"},
+    )
+
+
+def slow_article_renders(monkeypatch, delay):
+    """Make render_article_page slow; return (calls, started event)."""
+    render = blog_server.render_article_page
+    calls = []
+    started = threading.Event()
+
+    def slow_render(slug):
+        calls.append(slug)
+        started.set()
+        time.sleep(delay)
+        return render(slug)
+
+    monkeypatch.setattr(blog_server, "render_article_page", slow_render)
+    return calls, started
+
+
+def test_slow_render_does_not_delay_health(server, monkeypatch):
+    calls, started = slow_article_renders(monkeypatch, 0.5)
+
+    async def scenario():
+        async with client() as http:
+            article = asyncio.create_task(http.get("/article/post-1"))
+            await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+            began = time.perf_counter()
+            health = await http.get("/health")
+            latency = time.perf_counter() - began
+            assert not article.done()
+            return health, latency, await article
+
+    health, latency, article = asyncio.run(scenario())
+    assert health.status_code == 200
+    assert health.json() == {"status": "healthy", "posts": 3}
+    assert latency < 0.1
+    assert article.status_code == 200
+    assert calls == ["post-1"]
+
+
+def test_concurrent_article_requests_render_once(server, monkeypatch):
+    calls, _ = slow_article_renders(monkeypatch, 0.2)
+
+    async def scenario():
+        async with client() as http:
+            return await asyncio.gather(*(http.get("/article/post-2") for _ in range(8)))
+
+    responses = asyncio.run(scenario())
+    assert [response.status_code for response in responses] == [200] * 8
+    assert len({response.content for response in responses}) == 1
+    assert b"Body of post 2." in responses[0].content
+    assert calls == ["post-2"]
+
+
+def test_streamed_article_is_rendered_once(server, monkeypatch):
+    monkeypatch.setattr(blog_server, "STREAM_ARTICLES", True)
+    body_parts = blog_server.article_body_parts
+    calls = []
+
+    def slow_body_parts(index, slug):
+        calls.append(slug)
+        for part in body_parts(index, slug):
+            time.sleep(0.05)
+            yield part
+
+    monkeypatch.setattr(blog_server, "article_body_parts", slow_body_parts)
+
+    async def scenario():
+        async with client() as http:
+            first = asyncio.create_task(http.get("/article/post-3"))
+            # Let the first request start streaming before the others arrive
+            for _ in range(200):
+                if "article:post-3" in blog_server._inflight_renders:
+                    break
+                await asyncio.sleep(0.01)
+            else:
+                pytest.fail("the streamed render is not registered as in flight")
+            others = await asyncio.gather(*(http.get("/article/post-3") for _ in range(5)))
+            return await first, others
+
+    first, others = asyncio.run(scenario())
+    assert calls == ["post-3"]
+    assert first.headers["cache-control"] == "no-cache"
+    assert all(response.status_code == 200 for response in [first] + others)
+    # Later requests get the finished page, with its ETag
+    assert {response.content for response in others} == {first.content}
+    assert all("etag" in response.headers for response in others)
+
+
+def test_conditional_article_request_gets_304(server, monkeypatch):
+    monkeypatch.setattr(blog_server, "STREAM_ARTICLES", True)
+
+    async def scenario():
+        async with client() as http:
+            streamed = await http.get("/article/post-1")
+            cached = await http.get("/article/post-1")
+            revalidated = await http.get(
+                "/article/post-1", headers={"If-None-Match": cached.headers["etag"]}
+            )
+            return streamed, cached, revalidated
+
+    streamed, cached, revalidated = asyncio.run(scenario())
+    assert "etag" not in streamed.headers
+    assert streamed.content == cached.content
+    assert revalidated.status_code == 304
+
+
+CHART = b"""<html><body><div id="c"></div><script>
+Plotly.newPlot("c", [ { "y": [1.5, 2.5], "type": "bar" } ], { "title": { "text": "A" } })
+</script></body></html>
+"""
+
+
+def test_hashed_chart_url_names_the_served_bytes(tmp_path, monkeypatch):
+    (tmp_path / "chart.html").write_bytes(CHART)
+    manifest = AssetManifest(tmp_path).scan()
+    monkeypatch.setattr(blog_server, "STATIC_DIR", tmp_path)
+    monkeypatch.setattr(blog_server, "asset_manifest", manifest)
+    monkeypatch.setattr(blog_server, "chart_assets", ChartAssets(tmp_path))
+    monkeypatch.setattr(blog_server, "chart_pages", {})
+    blog_server.load_chart_assets()
+    served = blog_server.chart_assets.files["chart.html"]
+    assert served != CHART
+    hashed = manifest.hashed_path("chart.html")
+    assert hashed == hashed_name("chart.html", fingerprint(served))
+    assert manifest.rewrite('<iframe src="/static/chart.html">') == f'<iframe src="/static/{hashed}">'
+
+    static = blog_server.HashedStaticFiles(
+        directory=str(tmp_path), manifest=manifest, charts=blog_server.chart_pages, images=None
+    )
+
+    async def scenario():
+        app = Starlette(routes=[Mount("/static", static)])
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            stale = hashed_name("chart.html", file_fingerprint(tmp_path / "chart.html"))
+            return await http.get(f"/static/{hashed}"), await http.get(f"/static/{stale}")
+
+    response, stale = asyncio.run(scenario())
+    assert response.status_code == 200
+    assert response.content == served
+    assert response.headers["cache-control"] == blog_server.IMMUTABLE_CACHE_CONTROL
+    assert stale.status_code == 404
+    # A rescan of the unchanged file keeps the served bytes' hash
+    assert manifest.scan().hashed_path("chart.html") == hashed
+
+
+@pytest.fixture
+def prebuilt(server, tmp_path, monkeypatch):
+    """Build the test corpus in memory as the prebuilt site."""
+    monkeypatch.setattr(
+        build_site, "section_renderer", SectionRenderer(postprocess=build_site.chart_embeds)
+    )
+    server.prebuilt_site.build(tmp_path)
+    return server.prebuilt_site
+
+
+def test_fresh_prebuilt_article_redirects_temporarily(prebuilt, server, tmp_path):
+    async def scenario():
+        async with client() as http:
+            redirected = await http.get("/article/post-1")
+            os.utime(tmp_path / "post-1.md", (time.time() + 120,) * 2)
+            server.post_cache.refresh(True)
+            return redirected, await http.get("/article/post-1")
+
+    redirected, edited = asyncio.run(scenario())
+    assert redirected.status_code == 307
+    assert redirected.headers["location"] == "/post-1.html"
+    # Once the post is newer than the build, the same URL is rendered dynamically
+    assert edited.status_code == 200
+    assert b"Body of post 1." in edited.content
+
+
+def test_deleted_post_is_not_served_from_the_prebuilt_site(prebuilt, server, tmp_path):
+    async def scenario():
+        async with client() as http:
+            (tmp_path / "post-3.md").unlink()
+            server.post_cache.refresh(True)
+            paths = ("/article/post-3", "/post-3.html", "/article/post-2", "/post-2.html", "/article/post-1")
+            return [await http.get(path) for path in paths]
+
+    article, page, neighbour_article, neighbour_page, unaffected = asyncio.run(scenario())
+    assert article.status_code == 404
+    assert page.status_code == 404
+    # post-2 linked to post-3 as its next post: its prebuilt page is stale
+    assert neighbour_article.status_code == 200
+    assert neighbour_page.status_code == 200
+    assert b"post-3" not in neighbour_page.content
+    assert unaffected.status_code == 307
+
+
+def test_new_neighbour_makes_prebuilt_page_stale(prebuilt, server, tmp_path):
+    (tmp_path / "post-0.md").write_text(POST.format(number=0).replace("2024-01-00", "2023-12-31"))
+    stamp = time.time() - 3600
+    os.utime(tmp_path / "post-0.md", (stamp, stamp))
+    server.post_cache.refresh(True)
+    assert not prebuilt.is_fresh("post-1")
+    assert prebuilt.is_fresh("post-2")
+    assert not prebuilt.is_fresh("post-0")
+
+
+def age_posts(directory, seconds):
+    """Backdate the posts' mtimes; post-3 stays the newest."""
+    now = time.time()
+    for number in range(1, 4):
+        stamp = now - seconds + number * 10
+        os.utime(directory / f"post-{number}.md", (stamp, stamp))
+
+
+def test_deleted_neighbour_ends_304(server, tmp_path):
+    age_posts(tmp_path, 1000)
+    server.post_cache.refresh(True)
+
+    async def scenario():
+        async with client() as http:
+            before = await http.get("/article/post-2")
+            (tmp_path / "post-3.md").unlink()
+            server.post_cache.refresh(True)
+            after = await http.get(
+                "/article/post-2", headers={"If-Modified-Since": before.headers["last-modified"]}
+            )
+            return before, after
+
+    before, after = asyncio.run(scenario())
+    assert b'href="/article/post-3"' in before.content
+    # The page lost its link to post-3, so it must not be reported unchanged
+    assert after.status_code == 200
+    assert b'href="/article/post-3"' not in after.content
+
+
+def test_deleted_post_ends_listing_304(server, tmp_path):
+    age_posts(tmp_path, 1000)
+    server.post_cache.refresh(True)
+
+    async def scenario():
+        async with client() as http:
+            before = await http.get("/")
+            (tmp_path / "post-3.md").unlink()
+            server.post_cache.refresh(True)
+            after = await http.get("/", headers={"If-Modified-Since": before.headers["last-modified"]})
+            return before, after
+
+    before, after = asyncio.run(scenario())
+    assert b'href="/article/post-3"' in before.content
+    assert after.status_code == 200
+    assert b'href="/article/post-3"' not in after.content
@@ -0,0 +1,80 @@
+import os
+
+os.environ["BLOG_RENDER_CACHE"] = ""
+
+import blog_server  # noqa: E402
+import build_site  # noqa: E402
+
+# Raw string order would put "March" first, then "Dec", then the ISO date
+DATES = {"spring": "March 5, 2024", "winter": "2024-01-10", "autumn": "Dec 1, 2023"}
+
+
+def write_posts(directory):
+    paths = []
+    for slug, date in DATES.items():
+        path = directory / f"{slug}.md"
+        path.write_text(f"# {slug.title()}\ndate: {date}\nauthor: Tester\n\nBody.\n", encoding="utf-8")
+        paths.append(path)
+    return sorted(paths)
+
+
+def test_posts_are_sorted_by_parsed_date(tmp_path):
+    posts = build_site.load_posts(write_posts(tmp_path), verbose=False)
+    assert [post["slug"] for post in posts] == ["spring", "winter", "autumn"]
+
+
+def test_static_and_dynamic_post_order_agree(tmp_path):
+    paths = write_posts(tmp_path)
+    static = build_site.load_posts(paths, verbose=False)
+    dynamic = blog_server.PostIndex(blog_server.read_post_meta(path) for path in paths)
+    assert [post["slug"] for post in static] == [post.slug for post in dynamic.posts]
+
+    html = build_site.generate_index_html(list(reversed(static))).decode("utf-8")
+    links = [html.index(f'href="{slug}.html"') for slug in ("spring", "winter", "autumn")]
+    assert links == sorted(links)
+
+
+CHART = b"""<html><head><script type="text/javascript">/**
+* plotly.js v2.35.2
+*/ window.Plotly = {};</script></head><body></body></html>
+"""
+
+
+def test_assets_are_deduplicated_and_keep_their_directories(tmp_path, monkeypatch):
+    static = tmp_path / "static"
+    (static / "charts").mkdir(parents=True)
+    (static / "other").mkdir()
+    (static / "style.css").write_text("a{}")
+    (static / "copy.css").write_text("a{}")
+    (static / "other" / "style.css").write_text("b{}")
+    (static / "charts" / "gdp.html").write_bytes(CHART)
+    monkeypatch.setattr(build_site, "STATIC_DIR", static)
+    monkeypatch.setattr(build_site, "CONTENT_DIR", tmp_path / "content")
+
+    assets = build_site.AssetLinker({})
+    html, sources, missing = assets.link(
+        '<link href="static/style.css"><link href="static/copy.css">'
+        '<link href="static/other/style.css"><iframe src="static/charts/gdp.html"></iframe>'
+    )
+    style, copy, other, chart = (assets.output(source) for source in sources_by_name(sources))
+    assert missing == []
+    # Identical bytes share the output of the first file linked
+    assert copy == style == f"static/style.{build_site.fingerprint(b'a{}')}.css"
+    assert other == f"static/other/style.{build_site.fingerprint(b'b{}')}.css"
+    assert chart.startswith("static/charts/gdp.")
+    assert html.count(style) == 2 and other in html and chart in html
+
+    output = tmp_path / "site"
+    writer = build_site.IncrementalWriter(output, build_site.load_manifest(output))
+    assets.add_outputs(writer, sources)
+    written = sorted(path.relative_to(output).as_posix() for path in output.rglob("*") if path.is_file())
+    assert [name for name in written if name.endswith(".css")] == sorted([style, other])
+    script = next(name for name in written if "plotly-2.35.2" in name)
+    assert script.startswith("static/plotly-")
+    # The chart one directory down loads the shared script from the top
+    assert f'src="../{script[len("static/"):]}"'.encode() in (output / chart).read_bytes()
+
+
+def sources_by_name(sources):
+    names = ("static/style.css", "static/copy.css", "static/other/style.css", "static/charts/gdp.html")
+    return [next(source for source in sources if source.endswith(name)) for name in names]